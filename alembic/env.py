@@ -1,5 +1,5 @@
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config
 from alembic import context
 import asyncio
 from sqlalchemy.ext.asyncio import AsyncEngine
@@ -28,13 +28,13 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 # Tables gérées par le projet langchain (ne pas exclure)
-LANGCHAIN_TABLES = {
+LANGCHAIN_TABLES: frozenset[str] = frozenset({
     'chatbot_conversations',
     'insights',
     'subject_analyses',
     'response_embeddings',
     'analysis_cache',
-}
+})
 
 def include_object(object, name, type_, reflected, compare_to):
     """
@@ -44,7 +44,10 @@ def include_object(object, name, type_, reflected, compare_to):
     if type_ == "table":
         # Inclure uniquement les tables du projet langchain
         return name in LANGCHAIN_TABLES
-    # Inclure tous les autres objets (indexes, constraints, etc.) pour les tables langchain
+    # Indexes, colonnes, contraintes : filtrés selon leur table parente
+    parent = getattr(object, "table", None)
+    if parent is not None:
+        return parent.name in LANGCHAIN_TABLES
     return True
 
 def run_migrations_offline() -> None:
@@ -72,11 +75,16 @@ def do_run_migrations(connection):
 
 async def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # Une seule connexion poolée réutilisée pour toute la migration :
+    # évite un handshake par étape et garde le cache de statements asyncpg
     connectable = AsyncEngine(
         engine_from_config(
             config.get_section(config.config_ini_section),
             prefix="sqlalchemy.",
-            poolclass=pool.NullPool,
+            pool_size=1,
+            max_overflow=0,
+            pool_pre_ping=True,
+            connect_args={"statement_cache_size": 1024},
             future=True,
         )
     )
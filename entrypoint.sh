@@ -12,5 +12,5 @@ fi
 
 # Start the application
 echo "Starting uvicorn server..."
-exec uvicorn src.main:app --host 0.0.0.0 --port ${SERVICE_PORT:-8000}
+exec uvicorn src.main:app --host 0.0.0.0 --port ${SERVICE_PORT:-8000} --loop uvloop --http httptools
 
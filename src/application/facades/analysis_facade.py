@@ -1,4 +1,8 @@
-from typing import Dict, Any, List, Optional
+import asyncio
+import bisect
+import hashlib
+import statistics
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Set, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 
@@ -6,12 +10,22 @@ from src.application.use_cases.analyze_subject_sentiment import AnalyzeSubjectSe
 from src.application.use_cases.semantic_search import SemanticSearchUseCase
 from src.application.use_cases.cluster_responses import ClusterResponsesUseCase
 from src.application.use_cases.chatbot_query import ChatbotQueryUseCase
+from src.domain.repositories.analysis_cache_repository import IAnalysisCacheRepository
 from src.infrastructure.repositories.postgres_response_repository import (
     PostgresResponseRepository
 )
 from src.core.logger import app_logger
 from src.core.exceptions import NotFoundException, InsufficientDataException
 
+# Seuils (inclusifs) du risk score et niveaux correspondants
+_RISK_THRESHOLDS = (0.3, 0.5, 0.7)
+_RISK_LEVELS = ("low", "medium", "high", "critical")
+
+# Analyses en cours, par clé de cache. Module-level car la facade est
+# instanciée à chaque requête : les requêtes concurrentes sur la même clé
+# attendent le calcul déjà lancé au lieu d'en relancer un.
+_inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
 class AnalysisFacade:
     """
     Facade qui orchestre les analyses complexes
@@ -25,12 +39,14 @@ class AnalysisFacade:
         cluster_responses_uc: ClusterResponsesUseCase,
         chatbot_query_uc: ChatbotQueryUseCase,
         response_repo: PostgresResponseRepository,
+        cache_repo: Optional[IAnalysisCacheRepository] = None,
     ):
         self.analyze_sentiment_uc = analyze_sentiment_uc
         self.semantic_search_uc = semantic_search_uc
         self.cluster_responses_uc = cluster_responses_uc
         self.chatbot_query_uc = chatbot_query_uc
         self.response_repo = response_repo
+        self.cache_repo = cache_repo
     
     async def analyze_subject_sentiment(
         self,
@@ -38,6 +54,7 @@ class AnalysisFacade:
         period_days: int = 30,
         user_id: Optional[UUID] = None,
         form_type: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Analyse complète du sentiment pour une matière
@@ -50,37 +67,50 @@ class AnalysisFacade:
         app_logger.info(f"Facade: Analyzing sentiment for subject {subject_id}")
         
         try:
-            # 1. Analyse de sentiment
-            sentiment = await self.analyze_sentiment_uc.execute(
+            return await self._cached(
+                method="sentiment",
                 subject_id=subject_id,
                 period_days=period_days,
-                user_id=user_id,
                 form_type=form_type,
-            )
-            
-            # 2. Essayer d'identifier les thèmes (si assez de données)
-            try:
-                themes = await self.cluster_responses_uc.execute(
+                use_cache=use_cache,
+                compute=lambda: self._analyze_subject_sentiment(
                     subject_id=subject_id,
-                    n_clusters=5,
-                )
-                sentiment['themes'] = themes.get('clusters', [])
-            except InsufficientDataException:
-                app_logger.info("Not enough data for theme clustering")
-                sentiment['themes'] = []
-            
-            return sentiment
+                    period_days=period_days,
+                    user_id=user_id,
+                    form_type=form_type,
+                ),
+            )
             
         except Exception as e:
             app_logger.error(f"Error in sentiment analysis: {e}")
             raise
     
+    async def _analyze_subject_sentiment(
+        self,
+        subject_id: UUID,
+        period_days: int,
+        user_id: Optional[UUID] = None,
+        form_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # 1. Analyse de sentiment et 2. identification des thèmes (si assez
+        # de données) : indépendantes, donc lancées en parallèle
+        sentiment, themes = await self._sentiment_and_themes(
+            subject_id=subject_id,
+            period_days=period_days,
+            user_id=user_id,
+            form_type=form_type,
+        )
+        sentiment['themes'] = themes.get('clusters', [])
+        
+        return sentiment
+    
     async def generate_comprehensive_insights(
         self,
         subject_id: UUID,
         period_days: int = 30,
         user_id: Optional[UUID] = None,
         form_type: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Génère des insights complets combinant plusieurs analyses
@@ -93,22 +123,38 @@ class AnalysisFacade:
         """
         app_logger.info(f"Facade: Generating comprehensive insights for subject {subject_id}")
         
-        # 1. Analyse de sentiment
-        sentiment = await self.analyze_sentiment_uc.execute(
+        return await self._cached(
+            method="insights",
             subject_id=subject_id,
             period_days=period_days,
-            user_id=user_id,
             form_type=form_type,
+            use_cache=use_cache,
+            compute=lambda: self._generate_comprehensive_insights(
+                subject_id=subject_id,
+                period_days=period_days,
+                user_id=user_id,
+                form_type=form_type,
+            ),
         )
+    
+    async def _generate_comprehensive_insights(
+        self,
+        subject_id: UUID,
+        period_days: int,
+        user_id: Optional[UUID] = None,
+        form_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        # Date de référence unique : période analysée et generated_at cohérents
+        now = datetime.now()
         
-        # 2. Clustering des thèmes
-        try:
-            themes = await self.cluster_responses_uc.execute(
-                subject_id=subject_id,
-                n_clusters=5,
-            )
-        except InsufficientDataException:
-            themes = {'clusters': []}
+        # 1. Analyse de sentiment + 2. Clustering des thèmes (en parallèle)
+        sentiment, themes = await self._sentiment_and_themes(
+            subject_id=subject_id,
+            period_days=period_days,
+            user_id=user_id,
+            form_type=form_type,
+            as_of=now,
+        )
         
         # 3. Générer des insights via LLM
         # TODO: Créer GenerateInsightsUseCase qui utilise LangChainService
@@ -132,7 +178,7 @@ class AnalysisFacade:
             'sentiment': sentiment,
             'themes': themes.get('clusters', []),
             'insights': insights,
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': now.isoformat(),
         }
     
     async def semantic_search(
@@ -166,6 +212,23 @@ class AnalysisFacade:
             context=context,
         )
     
+    def chatbot_conversation_stream(
+        self,
+        query: str,
+        subject_id: UUID,
+        user_id: UUID,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Conversation avec le chatbot, réponse streamée fragment par fragment
+        """
+        return self.chatbot_query_uc.stream(
+            query=query,
+            subject_id=subject_id,
+            user_id=user_id,
+            context=context,
+        )
+    
     async def compare_subjects(
         self,
         subject_ids: List[UUID],
@@ -189,18 +252,26 @@ class AnalysisFacade:
         if len(subject_ids) < 2:
             raise ValueError("Need at least 2 subjects to compare")
         
-        # Analyser chaque matière
-        analyses = {}
-        for subject_id in subject_ids:
-            try:
-                analysis = await self.analyze_sentiment_uc.execute(
+        # Analyser chaque matière (en parallèle, les analyses sont indépendantes)
+        results = await asyncio.gather(
+            *(
+                self.analyze_sentiment_uc.execute(
                     subject_id=subject_id,
                     period_days=period_days,
                 )
-                analyses[str(subject_id)] = analysis
-            except InsufficientDataException:
+                for subject_id in subject_ids
+            ),
+            return_exceptions=True,
+        )
+        
+        analyses = {}
+        for subject_id, analysis in zip(subject_ids, results):
+            if isinstance(analysis, InsufficientDataException):
                 app_logger.warning(f"Insufficient data for subject {subject_id}")
                 continue
+            if isinstance(analysis, BaseException):
+                raise analysis
+            analyses[str(subject_id)] = analysis
         
         if len(analyses) < 2:
             raise InsufficientDataException(
@@ -210,10 +281,11 @@ class AnalysisFacade:
             )
         
         # Déterminer le "gagnant"
-        winner_id = max(analyses.keys(), key=lambda k: analyses[k]['overall_score'])
+        scores = {sid: a['overall_score'] for sid, a in analyses.items()}
+        winner_id = max(scores, key=scores.get)
         
         # Identifier les différences clés
-        key_differences = self._extract_key_differences(analyses)
+        key_differences = self._extract_key_differences(scores)
         
         return {
             'subjects_compared': len(analyses),
@@ -226,6 +298,7 @@ class AnalysisFacade:
         self,
         subject_id: UUID,
         lookback_days: int = 90,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Analyse prédictive : détecte les signaux faibles
@@ -240,23 +313,81 @@ class AnalysisFacade:
         """
         app_logger.info(f"Facade: Predicting risks for subject {subject_id}")
         
-        # 1. Analyser les 3 derniers mois par périodes de 30 jours
-        periods = [30, 60, 90]
+        return await self._cached(
+            method="risks",
+            subject_id=subject_id,
+            period_days=lookback_days,
+            use_cache=use_cache,
+            compute=lambda: self._predict_risks(
+                subject_id=subject_id,
+                lookback_days=lookback_days,
+            ),
+        )
+    
+    async def _predict_risks(
+        self,
+        subject_id: UUID,
+        lookback_days: int,
+    ) -> Dict[str, Any]:
+        # 1. Analyser les 3 derniers mois par périodes de 30 jours décalées,
+        #    de la plus ancienne à la plus récente, à partir d'une seule lecture
+        periods = [90, 60, 30]
         historical_data = []
         
+        now = datetime.now()
+        responses = await self.response_repo.get_text_responses_by_subject(
+            subject_id=subject_id,
+            period_start=now - timedelta(days=max(periods)),
+        )
+        star_ratings = await self.response_repo.get_star_ratings_by_subject(
+            subject_id=subject_id
+        )
+        
+        windows = []
         for days in periods:
-            try:
-                analysis = await self.analyze_sentiment_uc.execute(
+            window_start = now - timedelta(days=days)
+            window_end = window_start + timedelta(days=30)
+            window_responses = [
+                r for r in responses
+                if window_start <= self._as_local_naive(r['submitted_at']) < window_end
+            ]
+            # Une fenêtre avec moins de 2 réponses échouerait de toute façon
+            if len(window_responses) >= 2:
+                windows.append((days, window_start, window_end, window_responses))
+        
+        # Inutile de lancer les analyses LLM si la prédiction est impossible
+        if len(windows) < 2:
+            raise InsufficientDataException(
+                "Not enough historical data for prediction",
+                min_required=2,
+                actual=len(windows),
+            )
+        
+        results = await asyncio.gather(
+            *(
+                self.analyze_sentiment_uc.execute_on_responses(
                     subject_id=subject_id,
-                    period_days=30,  # Toujours 30j mais décalé
+                    responses=window_responses,
+                    star_ratings=star_ratings,
+                    period_start=window_start,
+                    period_end=window_end,
+                    period_days=30,
                 )
-                historical_data.append({
-                    'period': f"Last {days} days",
-                    'score': analysis['overall_score'],
-                    'response_count': analysis['total_responses'],
-                })
-            except InsufficientDataException:
+                for _, window_start, window_end, window_responses in windows
+            ),
+            return_exceptions=True,
+        )
+        
+        for (days, _, _, _), analysis in zip(windows, results):
+            if isinstance(analysis, InsufficientDataException):
                 continue
+            if isinstance(analysis, BaseException):
+                raise analysis
+            historical_data.append({
+                'period': f"{days - 30}-{days} days ago",
+                'score': analysis['overall_score'],
+                'response_count': analysis['total_responses'],
+            })
         
         if len(historical_data) < 2:
             raise InsufficientDataException(
@@ -271,24 +402,28 @@ class AnalysisFacade:
         
         # 3. Calculer le risk score
         risk_factors = []
+        factors_seen = set()
         risk_score = 0.0
         
         # Facteur 1: Tendance négative
         if trend < -0.1:
             risk_score += 0.3
             risk_factors.append(f"Tendance à la baisse ({trend:.2f})")
+            factors_seen.add("declining_trend")
         
         # Facteur 2: Score absolu bas
         current_score = scores[-1]
         if current_score < -0.2:
             risk_score += 0.3
             risk_factors.append(f"Score actuel bas ({current_score:.2f})")
+            factors_seen.add("low_score")
         
         # Facteur 3: Baisse du nombre de réponses
         response_counts = [d['response_count'] for d in historical_data]
         if len(response_counts) >= 2 and response_counts[-1] < response_counts[-2] * 0.7:
             risk_score += 0.2
             risk_factors.append("Baisse du taux de réponse (-30%)")
+            factors_seen.add("response_drop")
         
         # Facteur 4: Volatilité
         if len(scores) >= 3:
@@ -296,21 +431,15 @@ class AnalysisFacade:
             if volatility > 0.3:
                 risk_score += 0.2
                 risk_factors.append(f"Forte volatilité ({volatility:.2f})")
+                factors_seen.add("volatility")
         
         risk_score = min(risk_score, 1.0)
         
         # 4. Niveau de risque
-        if risk_score >= 0.7:
-            risk_level = "critical"
-        elif risk_score >= 0.5:
-            risk_level = "high"
-        elif risk_score >= 0.3:
-            risk_level = "medium"
-        else:
-            risk_level = "low"
+        risk_level = _RISK_LEVELS[bisect.bisect_right(_RISK_THRESHOLDS, risk_score)]
         
         # 5. Recommandations
-        recommendations = self._generate_risk_recommendations(risk_factors, risk_level)
+        recommendations = self._generate_risk_recommendations(factors_seen, risk_level)
         
         return {
             'subject_id': str(subject_id),
@@ -325,6 +454,119 @@ class AnalysisFacade:
     
     # === Private helpers ===
     
+    async def _cached(
+        self,
+        method: str,
+        subject_id: UUID,
+        period_days: int,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        form_type: Optional[str] = None,
+        use_cache: bool = True,
+        ttl: timedelta = timedelta(hours=24),
+    ) -> Dict[str, Any]:
+        """
+        Cache adressé par contenu pour les analyses coûteuses (LLM + DB)
+        
+        La clé inclut la version des réponses de la matière (nombre + date de
+        la dernière soumission) : toute nouvelle réponse change la clé, ce qui
+        invalide implicitement les entrées précédentes sans dépendre du TTL.
+        
+        En cas de miss, les appels concurrents sur la même clé partagent un
+        seul calcul (pas de stampede LLM avant que le cache soit rempli).
+        """
+        if self.cache_repo is None or not use_cache:
+            return await compute()
+        
+        version = await self.response_repo.get_responses_version(subject_id)
+        digest = hashlib.sha1(
+            f"{method}:{subject_id}:{period_days}:{form_type}:{version}".encode()
+        ).hexdigest()
+        cache_key = f"facade_{method}_{subject_id}_{digest}"
+        
+        cached = await self.cache_repo.get(cache_key)
+        if cached is not None:
+            app_logger.info(f"Using cached {method} analysis for subject {subject_id}")
+            return cached
+        
+        while (pending := _inflight.get(cache_key)) is not None:
+            app_logger.info(f"Joining in-flight {method} analysis for subject {subject_id}")
+            try:
+                # shield : l'annulation d'un appelant n'annule pas le calcul partagé
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Calcul annulé avec la requête qui l'avait lancé (client
+                # déconnecté) : on le reprend, sauf si c'est nous qui sommes annulés
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                app_logger.info(f"In-flight {method} analysis for subject {subject_id} was cancelled, retrying")
+        
+        future = asyncio.get_running_loop().create_future()
+        # Évite l'avertissement "exception never retrieved" sans attendant
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _inflight[cache_key] = future
+        
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            _inflight.pop(cache_key, None)
+        
+        # Analyse déjà calculée : un échec d'écriture du cache ne doit pas
+        # transformer la requête en erreur
+        try:
+            await self.cache_repo.set(cache_key, result, datetime.now() + ttl)
+        except Exception as e:
+            app_logger.warning(f"Could not cache {method} analysis for subject {subject_id}: {e}")
+        
+        return result
+    
+    async def _sentiment_and_themes(
+        self,
+        subject_id: UUID,
+        period_days: int,
+        user_id: Optional[UUID] = None,
+        form_type: Optional[str] = None,
+        as_of: Optional[datetime] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Lance l'analyse de sentiment et le clustering en parallèle
+        
+        Le clustering est best-effort : si les données sont insuffisantes,
+        les thèmes sont vides. Les erreurs du sentiment sont propagées.
+        """
+        sentiment, themes = await asyncio.gather(
+            self.analyze_sentiment_uc.execute(
+                subject_id=subject_id,
+                period_days=period_days,
+                user_id=user_id,
+                form_type=form_type,
+                as_of=as_of,
+            ),
+            self.cluster_responses_uc.execute(
+                subject_id=subject_id,
+                n_clusters=5,
+            ),
+            return_exceptions=True,
+        )
+        
+        if isinstance(sentiment, BaseException):
+            raise sentiment
+        
+        if isinstance(themes, InsufficientDataException):
+            app_logger.info("Not enough data for theme clustering")
+            themes = {'clusters': []}
+        elif isinstance(themes, BaseException):
+            raise themes
+        
+        return sentiment, themes
+    
     async def _generate_insights_from_data(
         self,
         sentiment: Dict[str, Any],
@@ -334,42 +576,46 @@ class AnalysisFacade:
         """Génère des insights actionnables"""
         insights = []
         
+        overall_score = sentiment['overall_score']
+        trend_percentage = sentiment.get('trend_percentage')
+        clusters = themes.get('clusters') or []
+        recommendations = sentiment.get('recommendations') or []
+        
         # Insight 1: Sentiment global
-        if sentiment['overall_score'] > 0.5:
+        if overall_score > 0.5:
             insights.append({
                 'type': 'positive',
                 'priority': 'low',
                 'title': 'Excellent sentiment général',
-                'content': f"Les élèves sont très satisfaits (score: {sentiment['overall_score']:.2f})",
-                'evidence': sentiment.get('positive_evidence', []),
+                'content': f"Les élèves sont très satisfaits (score: {overall_score:.2f})",
+                'evidence': sentiment.get('positive_evidence') or [],
             })
-        elif sentiment['overall_score'] < -0.3:
+        elif overall_score < -0.3:
             insights.append({
                 'type': 'alert',
                 'priority': 'high',
                 'title': 'Sentiment négatif détecté',
-                'content': f"Attention : le sentiment est négatif (score: {sentiment['overall_score']:.2f})",
-                'evidence': sentiment.get('negative_evidence', []),
+                'content': f"Attention : le sentiment est négatif (score: {overall_score:.2f})",
+                'evidence': sentiment.get('negative_evidence') or [],
             })
         
         # Insight 2: Tendance
-        if sentiment.get('trend_percentage'):
-            if sentiment['trend_percentage'] < -15:
-                insights.append({
-                    'type': 'alert',
-                    'priority': 'urgent',
-                    'title': 'Baisse significative du sentiment',
-                    'content': f"Le sentiment a baissé de {abs(sentiment['trend_percentage']):.0f}% vs période précédente",
-                    'evidence': [],
-                })
-        
-        # Insight 3: Thèmes négatifs
+        if trend_percentage and trend_percentage < -15:
+            insights.append({
+                'type': 'alert',
+                'priority': 'urgent',
+                'title': 'Baisse significative du sentiment',
+                'content': f"Le sentiment a baissé de {abs(trend_percentage):.0f}% vs période précédente",
+                'evidence': [],
+            })
+        
+        # Insight 3: Thèmes négatifs (top 2)
         negative_themes = [
-            t for t in themes.get('clusters', [])
-            if t.get('sentiment', 0) < -0.3
-        ]
+            t for t in clusters
+            if (t.get('sentiment') or 0) < -0.3
+        ][:2]
         
-        for theme in negative_themes[:2]:  # Top 2 thèmes négatifs
+        for theme in negative_themes:
             insights.append({
                 'type': 'negative',
                 'priority': 'high',
@@ -379,7 +625,7 @@ class AnalysisFacade:
             })
         
         # Insight 4: Recommandations
-        for rec in sentiment.get('recommendations', [])[:3]:
+        for rec in recommendations[:3]:
             insights.append({
                 'type': 'recommendation',
                 'priority': 'medium',
@@ -390,12 +636,11 @@ class AnalysisFacade:
         
         return insights
     
-    def _extract_key_differences(self, analyses: Dict[str, Any]) -> List[str]:
+    def _extract_key_differences(self, scores: Dict[str, float]) -> List[str]:
         """Identifie les différences clés entre analyses"""
         differences = []
         
         # Comparer les scores
-        scores = {k: v['overall_score'] for k, v in analyses.items()}
         max_score = max(scores.values())
         min_score = min(scores.values())
         
@@ -407,30 +652,34 @@ class AnalysisFacade:
         
         return differences
     
+    @staticmethod
+    def _as_local_naive(value: datetime) -> datetime:
+        """Ramène une date (éventuellement tz-aware) en heure locale naïve"""
+        if value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
+    
     def _calculate_trend_slope(self, scores: List[float]) -> float:
         """Calcule la pente de la tendance"""
-        import numpy as np
-        
-        if len(scores) < 2:
+        n = len(scores)
+        if n < 2:
             return 0.0
         
-        x = np.arange(len(scores))
-        y = np.array(scores)
-        
-        # Régression linéaire simple
-        coeffs = np.polyfit(x, y, 1)
-        slope = coeffs[0]
+        # Régression linéaire simple (moindres carrés, forme fermée)
+        mean_x = (n - 1) / 2
+        mean_y = sum(scores) / n
+        num = sum((i - mean_x) * (s - mean_y) for i, s in enumerate(scores))
+        den = sum((i - mean_x) ** 2 for i in range(n))
         
-        return float(slope)
+        return num / den if den else 0.0
     
     def _calculate_volatility(self, scores: List[float]) -> float:
         """Calcule la volatilité (écart-type)"""
-        import numpy as np
-        return float(np.std(scores))
+        return statistics.pstdev(scores)
     
     def _generate_risk_recommendations(
         self,
-        risk_factors: List[str],
+        factors_seen: Set[str],
         risk_level: str,
     ) -> List[str]:
         """Génère des recommandations basées sur les facteurs de risque"""
@@ -440,10 +689,10 @@ class AnalysisFacade:
             recommendations.append("Organiser une session de feedback avec les élèves sous 48h")
             recommendations.append("Analyser les thèmes négatifs en détail")
         
-        if "Tendance à la baisse" in str(risk_factors):
+        if "declining_trend" in factors_seen:
             recommendations.append("Revoir le contenu et la pédagogie du cours")
         
-        if "taux de réponse" in str(risk_factors):
+        if "response_drop" in factors_seen:
             recommendations.append("Relancer l'engagement des élèves (rappels, incentives)")
         
         if not recommendations:
@@ -1,4 +1,5 @@
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 
@@ -7,6 +8,7 @@ from src.infrastructure.repositories.postgres_response_repository import (
     PostgresResponseRepository
 )
 from src.infrastructure.frameworks.langchain_service import LangChainService
+from src.infrastructure.frameworks.embedding_service import EmbeddingService
 from src.domain.entities.sentiment import SentimentAnalysis, SentimentEvidence
 from src.core.logger import app_logger
 from src.core.exceptions import InsufficientDataException
@@ -19,10 +21,14 @@ class AnalyzeSubjectSentimentUseCase:
         response_repo: PostgresResponseRepository,
         embedding_repo: IEmbeddingRepository,
         langchain_service: LangChainService,
+        max_llm_responses: int = 50,
+        embedding_service: Optional[EmbeddingService] = None,
     ):
         self.response_repo = response_repo
         self.embedding_repo = embedding_repo
         self.langchain_service = langchain_service
+        self.embedding_service = embedding_service
+        self.max_llm_responses = max_llm_responses
     
     async def execute(
         self,
@@ -30,6 +36,7 @@ class AnalyzeSubjectSentimentUseCase:
         period_days: int = 30,
         user_id: Optional[UUID] = None,
         form_type: Optional[str] = None,
+        as_of: Optional[datetime] = None,
     ) -> Dict[str, Any]:
         """
         Analyse le sentiment pour une matière
@@ -39,6 +46,8 @@ class AnalyzeSubjectSentimentUseCase:
             period_days: Période d'analyse en jours
             user_id: ID de l'utilisateur (pour traçabilité)
             form_type: Type de formulaire ("during_course" ou "after_course")
+            as_of: Fin de la période (maintenant par défaut), pour partager
+                la même date de référence avec l'appelant
         
         Returns:
             Analyse de sentiment complète
@@ -48,36 +57,72 @@ class AnalyzeSubjectSentimentUseCase:
             log_msg += f" (form_type: {form_type})"
         app_logger.info(log_msg)
         
-        period_start = datetime.now() - timedelta(days=period_days)
+        now = as_of or datetime.now()
+        period_start = now - timedelta(days=period_days)
         responses = await self.response_repo.get_text_responses_by_subject(
             subject_id=subject_id,
             period_start=period_start,
             form_type=form_type,
         )
         
-        if len(responses) < 2:
-            raise InsufficientDataException(
-                "Not enough responses for sentiment analysis",
-                min_required=2,
-                actual=len(responses),
-            )
-        
-        star_ratings = await self.response_repo.get_star_ratings_by_subject(
-            subject_id=subject_id
+        return await self.execute_on_responses(
+            subject_id=subject_id,
+            responses=responses,
+            period_start=period_start,
+            period_end=now,
+            period_days=period_days,
         )
+    
+    async def execute_on_responses(
+        self,
+        subject_id: UUID,
+        responses: List[dict],
+        period_start: datetime,
+        star_ratings: Optional[List[dict]] = None,
+        period_end: Optional[datetime] = None,
+        period_days: int = 30,
+    ) -> Dict[str, Any]:
+        """
+        Analyse le sentiment à partir de données déjà récupérées
         
-        star_score = self._calculate_star_score(star_ratings)
+        Permet aux appelants qui analysent plusieurs fenêtres d'une même
+        matière de ne lire les réponses qu'une seule fois en base.
+        
+        Args:
+            subject_id: ID de la matière
+            responses: Réponses textuelles de la période
+            period_start: Début de la période analysée
+            star_ratings: Notes étoiles agrégées de la matière (récupérées
+                en parallèle de l'appel LLM si absentes)
+            period_end: Fin de la période analysée (maintenant par défaut)
+            period_days: Durée de la période (pour le calcul de tendance)
+        
+        Returns:
+            Analyse de sentiment complète
+        """
+        self._ensure_enough_responses(responses)
         
-        text_responses = [r['value_text'] for r in responses if r.get('value_text')]
+        text_responses = self._prepare_llm_inputs(responses, self.max_llm_responses)
         
         # Récupérer le nom de la matière (simplification, devrait venir d'un repo)
         subject_name = "Matière"  # TODO: get from subject repository
         
-        llm_analysis = await self.langchain_service.analyze_sentiment(
+        llm_call = self.langchain_service.analyze_sentiment(
             subject_name=subject_name,
             responses=text_responses,
         )
         
+        # La requête des notes étoiles est indépendante de l'appel LLM
+        if star_ratings is None:
+            star_ratings, llm_analysis = await asyncio.gather(
+                self.response_repo.get_star_ratings_by_subject(subject_id=subject_id),
+                llm_call,
+            )
+        else:
+            llm_analysis = await llm_call
+        
+        star_score = self._calculate_star_score(star_ratings)
+        
         combined_score = self._combine_scores(
             llm_score=llm_analysis.get('overall_score', 0),
             star_score=star_score,
@@ -87,19 +132,19 @@ class AnalyzeSubjectSentimentUseCase:
         
         trend = await self._calculate_trend(subject_id, period_days, combined_score)
         
-        positive_evidence = self._extract_evidence(
-            responses, 
-            llm_analysis.get('positive_points', [])
-        )
-        negative_evidence = self._extract_evidence(
+        positive_evidence, negative_evidence = await self._collect_evidence(
+            subject_id,
             responses,
-            llm_analysis.get('negative_points', [])
+            llm_analysis.get('positive_points', []),
+            llm_analysis.get('negative_points', []),
+            period_start=period_start,
+            period_end=period_end,
         )
         
         result = {
             "subject_id": str(subject_id),
             "period_start": period_start.isoformat(),
-            "period_end": datetime.now().isoformat(),
+            "period_end": (period_end or datetime.now()).isoformat(),
             "overall_score": combined_score,
             "confidence": llm_analysis.get('confidence', 0.7),
             "label": self._get_label(combined_score),
@@ -120,6 +165,36 @@ class AnalyzeSubjectSentimentUseCase:
         
         return result
     
+    def _prepare_llm_inputs(self, responses: List[dict], max_n: int) -> List[str]:
+        """
+        Dédoublonne les commentaires avant l'envoi au LLM
+        
+        Les réponses identiques à la casse et aux espaces près ("bien", "ok")
+        ne sont envoyées qu'une fois ; le texte d'origine est conservé.
+        """
+        seen = set()
+        out = []
+        for r in responses:
+            text = r.get('value_text')
+            if not text:
+                continue
+            key = ' '.join(text.lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                out.append(text)
+                if len(out) == max_n:
+                    break
+        return out
+    
+    def _ensure_enough_responses(self, responses: list) -> None:
+        """Vérifie qu'il y a assez de réponses pour une analyse"""
+        if len(responses) < 2:
+            raise InsufficientDataException(
+                "Not enough responses for sentiment analysis",
+                min_required=2,
+                actual=len(responses),
+            )
+    
     def _calculate_star_score(self, star_ratings: list) -> float:
         """Convertit les étoiles (1-5) en score (-1 à 1)"""
         if not star_ratings:
@@ -175,24 +250,101 @@ class AnalyzeSubjectSentimentUseCase:
         # Pour l'instant, retourner None
         return None
     
+    async def _collect_evidence(
+        self,
+        subject_id: UUID,
+        responses: list,
+        positive_points: list,
+        negative_points: list,
+        period_start: Optional[datetime] = None,
+        period_end: Optional[datetime] = None,
+    ) -> Tuple[list, list]:
+        """
+        Associe à chaque point (top 3) la réponse la plus proche sémantiquement
+        
+        Les points sont vectorisés en un seul appel puis recherchés parmi les
+        embeddings de la matière soumis pendant la période analysée. Repli
+        sur la recherche par mots-clés pour un point sans correspondance, ou
+        pour tous si les embeddings ne sont pas disponibles.
+        """
+        positive_points = positive_points[:3]
+        negative_points = negative_points[:3]
+        points = positive_points + negative_points
+        
+        if self.embedding_service is None or not points:
+            return (
+                self._extract_evidence(responses, positive_points),
+                self._extract_evidence(responses, negative_points),
+            )
+        
+        try:
+            point_embeddings = await self.embedding_service.embed_batch(points)
+            
+            by_id = {str(r['response_id']): r for r in responses if r.get('value_text')}
+            evidence = []
+            for point, point_embedding in zip(points, point_embeddings):
+                similar = await self.embedding_repo.find_similar(
+                    query_embedding=point_embedding,
+                    subject_id=subject_id,
+                    limit=10,
+                    similarity_threshold=0.3,
+                    submitted_after=period_start,
+                    submitted_before=period_end,
+                )
+                match = next(
+                    (
+                        by_id[emb.response_id_str]
+                        for emb, _ in similar
+                        if emb.response_id_str in by_id
+                    ),
+                    None,
+                )
+                if match:
+                    evidence.append(self._evidence_item(point, match))
+                else:
+                    # Réponses pas encore indexées, ou hors du filtre de formulaire
+                    keyword_match = self._extract_evidence(responses, [point])
+                    evidence.append(keyword_match[0] if keyword_match else None)
+        except Exception as e:
+            app_logger.warning(f"Semantic evidence lookup failed, using keywords: {e}")
+            return (
+                self._extract_evidence(responses, positive_points),
+                self._extract_evidence(responses, negative_points),
+            )
+        
+        n_positive = len(positive_points)
+        return (
+            [e for e in evidence[:n_positive] if e],
+            [e for e in evidence[n_positive:] if e],
+        )
+    
+    def _evidence_item(self, point: str, response: dict) -> dict:
+        """Formate une preuve (citation tronquée) pour un point"""
+        return {
+            'point': point,
+            'example': response['value_text'][:200],
+            'response_id': str(response['response_id']),
+        }
+    
     def _extract_evidence(self, responses: list, points: list) -> list:
-        """Extrait des citations comme preuves"""
+        """Extrait des citations comme preuves (par mots-clés)"""
+        # Textes mis en minuscules une seule fois pour tous les points
+        lowered = [
+            (r, r['value_text'].lower())
+            for r in responses
+            if r.get('value_text')
+        ]
+        
         evidence = []
         for point in points[:3]:  # Top 3
-            # Chercher des réponses contenant les mots-clés du point
-            matching = [
-                r for r in responses
-                if r.get('value_text') and any(
-                    keyword.lower() in r['value_text'].lower()
-                    for keyword in point.split()[:3]
-                )
-            ]
-            if matching:
-                evidence.append({
-                    'point': point,
-                    'example': matching[0]['value_text'][:200],
-                    'response_id': str(matching[0]['response_id']),
-                })
+            # Première réponse contenant un des mots-clés du point
+            keywords = [keyword.lower() for keyword in point.split()[:3]]
+            match = next(
+                (r for r, text in lowered if any(k in text for k in keywords)),
+                None,
+            )
+            if match:
+                evidence.append(self._evidence_item(point, match))
         return evidence
     
     def _get_label(self, score: float) -> str:
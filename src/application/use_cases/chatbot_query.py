@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any
 from uuid import UUID
 
 from src.infrastructure.frameworks.agent_service import TeacherAssistantAgent
@@ -51,4 +51,44 @@ class ChatbotQueryUseCase:
             "answer": result['answer'],
             "tools_used": result['tools_used'],
             "intermediate_steps": result.get('intermediate_steps', []),
-        }
\ No newline at end of file
+        }
+    
+    async def stream(
+        self,
+        query: str,
+        subject_id: UUID,
+        user_id: UUID,
+        context: Dict[str, Any] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante streamée de execute : les fragments de la réponse sont
+        transmis au fur et à mesure de leur génération
+        
+        Yields:
+            {"type": "token", "value": str} pour chaque fragment, puis
+            {
+                "type": "result",
+                "query": str,
+                "answer": str,
+                "tools_used": List[str],
+                "intermediate_steps": List[dict],
+            }
+        """
+        app_logger.info(f"Chatbot streaming query from user {user_id}: {query[:100]}...")
+        
+        async for chunk in self.agent.stream_query(
+            question=query,
+            subject_id=str(subject_id),
+            context=context,
+        ):
+            if chunk["type"] == "result":
+                app_logger.info(f"Chatbot response generated using tools: {chunk['tools_used']}")
+                yield {
+                    "type": "result",
+                    "query": query,
+                    "answer": chunk['answer'],
+                    "tools_used": chunk['tools_used'],
+                    "intermediate_steps": chunk.get('intermediate_steps', []),
+                }
+            else:
+                yield chunk
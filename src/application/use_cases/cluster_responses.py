@@ -1,16 +1,52 @@
-from typing import Dict, Any, List
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from uuid import UUID
 import numpy as np
-import warnings
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.exceptions import ConvergenceWarning
+import weakref
+from sklearn.preprocessing import normalize
 
+from src.configs import get_settings
 from src.domain.repositories.embedding_repository import IEmbeddingRepository
 from src.infrastructure.frameworks.langchain_service import LangChainService
 from src.core.logger import app_logger
 from src.core.exceptions import InsufficientDataException
 
+settings = get_settings()
+
+# Les modèles text-embedding-3 sont entraînés pour rester pertinents une fois
+# tronqués (Matryoshka) : le clustering se fait sur les premières dimensions,
+# renormalisées, ce qui divise d'autant le coût des calculs de distance
+_MATRYOSHKA_MODEL_PREFIX = "text-embedding-3"
+_CLUSTERING_DIMS = 256
+
+# Cache LRU (process) des analyses LLM de clusters, indexé par le hash du
+# prompt : un même groupe d'exemples n'est envoyé qu'une fois au LLM
+_CLUSTER_ANALYSIS_CACHE_SIZE = 512
+_cluster_analysis_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Centroïdes KMeans par (matière, n_clusters), avec la version du jeu
+# d'embeddings (nombre + dernière mise à jour) pour lequel ils ont été calculés
+_CENTROID_CACHE_SIZE = 256
+_centroid_cache: "OrderedDict[Tuple[str, int], Tuple[np.ndarray, str]]" = OrderedDict()
+
+# Nombre max d'appels LLM de clustering simultanés (toutes matières
+# confondues) pour rester sous les rate limits du fournisseur. Un sémaphore
+# par event loop : les jobs Celery en créent un nouveau à chaque tâche.
+_MAX_CONCURRENT_LLM_CALLS = 16
+_llm_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+def _llm_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_LLM_CALLS)
+        _llm_semaphores[loop] = semaphore
+    return semaphore
+
 class ClusterResponsesUseCase:
     """Use case pour regrouper les réponses par thèmes (clustering)"""
     
@@ -26,6 +62,7 @@ class ClusterResponsesUseCase:
         self,
         subject_id: UUID,
         n_clusters: int = 5,
+        max_samples: int = 1000,
     ) -> Dict[str, Any]:
         """
         Regroupe les réponses par thèmes via clustering
@@ -33,6 +70,7 @@ class ClusterResponsesUseCase:
         Args:
             subject_id: ID de la matière
             n_clusters: Nombre de clusters souhaités
+            max_samples: Nombre max d'embeddings chargés pour le clustering
         
         Returns:
             {
@@ -51,16 +89,31 @@ class ClusterResponsesUseCase:
         """
         app_logger.info(f"Clustering responses for subject {subject_id} (requested n_clusters={n_clusters})")
         
-        dummy_embedding = [0.0] * 1536
+        # Les embeddings sont streamés depuis la base et copiés au fil de
+        # l'eau dans une matrice float32 préallouée : seuls les textes, ids
+        # et dates sont conservés par ligne
+        embeddings_data = None
+        texts: List[str] = []
+        response_ids: List[str] = []
+        latest_update = None
         
-        all_results = await self.embedding_repo.find_similar(
-            query_embedding=dummy_embedding,
+        async for emb in self.embedding_repo.iter_by_subject(
             subject_id=subject_id,
-            limit=1000,
-            similarity_threshold=0.0,
-        )
+            limit=max_samples,
+        ):
+            if embeddings_data is None:
+                dims = self._clustering_dims(len(emb.embedding))
+                embeddings_data = np.empty((max_samples, dims), dtype=np.float32)
+            
+            embeddings_data[len(texts)] = emb.embedding[:embeddings_data.shape[1]]
+            texts.append(emb.text_content)
+            response_ids.append(emb.response_id_str)
+            
+            updated = emb.updated_at or emb.created_at
+            if updated and (latest_update is None or updated > latest_update):
+                latest_update = updated
         
-        num_responses = len(all_results)
+        num_responses = len(texts)
         
         # Minimum 2 responses required for clustering
         if num_responses < 2:
@@ -91,54 +144,61 @@ class ClusterResponsesUseCase:
                 f"(available responses: {num_responses})"
             )
         
-        embeddings_list = [emb.embedding for emb, _ in all_results]
-        embeddings_data = np.array(embeddings_list)
-        
-        scaler = StandardScaler()
-        embeddings_normalized = scaler.fit_transform(embeddings_data)
-        
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", category=ConvergenceWarning)
-            kmeans = KMeans(n_clusters=adjusted_n_clusters, random_state=42, n_init=10)
-            cluster_labels = kmeans.fit_predict(embeddings_normalized)
+        if adjusted_n_clusters == num_responses:
+            # Chaque réponse forme son propre cluster : rien à calculer
+            cluster_labels = np.arange(num_responses)
+        else:
+            # Version du jeu d'embeddings (nombre + dernière mise à jour)
+            version = f"{num_responses}:{latest_update.isoformat() if latest_update else ''}"
+            cluster_labels = self._cluster_labels(
+                subject_id,
+                embeddings_data[:num_responses],
+                version,
+                adjusted_n_clusters,
+            )
         
-
         unique_clusters = len(set(cluster_labels))
         app_logger.info(
             f"Clustering completed: {unique_clusters} unique clusters identified "
             f"(requested: {adjusted_n_clusters}, responses: {num_responses})"
         )
         
+        # Regroupement vectorisé : indices triés par cluster, puis découpés
+        # aux frontières de chaque cluster
+        order = np.argsort(cluster_labels, kind="stable")
+        boundaries = np.searchsorted(
+            cluster_labels[order], np.arange(adjusted_n_clusters + 1)
+        )
+        
         clusters_data = {}
-        for idx, (embedding, _) in enumerate(all_results):
-            cluster_id = int(cluster_labels[idx])
-            if cluster_id not in clusters_data:
-                clusters_data[cluster_id] = {
-                    "embeddings": [],
-                    "texts": [],
-                    "response_ids": [],
-                }
-            clusters_data[cluster_id]["embeddings"].append(embedding.embedding)
-            clusters_data[cluster_id]["texts"].append(embedding.text_content)
-            clusters_data[cluster_id]["response_ids"].append(str(embedding.response_id))
+        for cluster_id in range(adjusted_n_clusters):
+            idxs = order[boundaries[cluster_id]:boundaries[cluster_id + 1]]
+            if len(idxs) == 0:
+                continue
+            clusters_data[cluster_id] = {
+                "texts": [texts[i] for i in idxs],
+                "response_ids": [response_ids[i] for i in idxs],
+            }
+        
+        # Label et mots-clés de chaque cluster en un seul appel LLM,
+        # tous les clusters en parallèle
+        analyses = await asyncio.gather(*(
+            self._analyze_cluster(data["texts"][:5])
+            for data in clusters_data.values()
+        ))
         
         clusters = []
-        for cluster_id, data in clusters_data.items():
+        for (cluster_id, data), analysis in zip(clusters_data.items(), analyses):
             # Calculer le sentiment moyen du cluster (simplifié)
             # En pratique, on devrait analyser chaque texte
             sentiment = 0.0  # TODO: Calculer réellement
             
-            examples_text = "\n".join([f"- {text[:100]}" for text in data["texts"][:5]])
-            label = await self._generate_cluster_label(examples_text)
-            
-            keywords = await self._extract_keywords(data["texts"][:10])
-            
             clusters.append({
                 "id": f"cluster_{cluster_id}",
-                "label": label,
+                "label": analysis["label"],
                 "count": len(data["texts"]),
                 "sentiment": sentiment,
-                "keywords": keywords,
+                "keywords": analysis["keywords"],
                 "examples": data["texts"][:3],
                 "response_ids": data["response_ids"],
             })
@@ -147,56 +207,161 @@ class ClusterResponsesUseCase:
         
         return {
             "clusters": clusters,
-            "total_responses": len(all_results),
+            "total_responses": num_responses,
             "n_clusters": adjusted_n_clusters,
             "requested_n_clusters": n_clusters,
         }
     
-    async def _generate_cluster_label(self, examples_text: str) -> str:
-        """Génère un label pour un cluster via LLM"""
+    def _clustering_dims(self, dims: int) -> int:
+        """Dimensions retenues pour le clustering (troncature si le modèle le permet)"""
+        if settings.EMBEDDING_MODEL.startswith(_MATRYOSHKA_MODEL_PREFIX):
+            return min(dims, _CLUSTERING_DIMS)
+        return dims
+    
+    def _cluster_labels(
+        self,
+        subject_id: UUID,
+        embeddings_data: np.ndarray,
+        version: str,
+        n_clusters: int,
+    ) -> np.ndarray:
+        """Affecte chaque embedding à un cluster (centroïdes en cache si possible)"""
+        # Normalisation L2 : sur des vecteurs unitaires, l'affectation au
+        # centroïde le plus proche se réduit à un argmax du produit scalaire
+        embeddings_normalized = normalize(embeddings_data, norm="l2", axis=1, copy=False)
+        
+        # Les centroïdes d'un même jeu d'embeddings sont réutilisés : seule
+        # l'affectation (un produit matriciel) est recalculée
+        centroid_key = (str(subject_id), n_clusters)
+        
+        cached = _centroid_cache.get(centroid_key)
+        if cached is not None and cached[1] == version:
+            _centroid_cache.move_to_end(centroid_key)
+            centroids = cached[0]
+            app_logger.info(f"Reusing cached centroids for subject {subject_id}")
+            cluster_labels = (embeddings_normalized @ centroids.T).argmax(axis=1)
+        else:
+            cluster_labels, centroids = self._fit_clusters(
+                embeddings_normalized, n_clusters
+            )
+            _centroid_cache[centroid_key] = (centroids, version)
+            if len(_centroid_cache) > _CENTROID_CACHE_SIZE:
+                _centroid_cache.popitem(last=False)
+        
+        return cluster_labels
+    
+    def _fit_clusters(
+        self,
+        embeddings_normalized: np.ndarray,
+        n_clusters: int,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Clustering des embeddings, retourne (labels, centroïdes unitaires)"""
+        # Réponses identiques : un seul point pondéré par son nombre
+        # d'occurrences (mêmes centroïdes, matrice plus petite)
+        unique_embeddings, inverse, counts = np.unique(
+            embeddings_normalized, axis=0, return_inverse=True, return_counts=True
+        )
+        if len(unique_embeddings) >= n_clusters:
+            labels, centroids = self._spherical_kmeans(
+                unique_embeddings, n_clusters, weights=counts.astype(np.float32)
+            )
+            return labels[inverse.reshape(-1)], centroids
+        
+        return self._spherical_kmeans(embeddings_normalized, n_clusters)
+    
+    def _spherical_kmeans(
+        self,
+        X: np.ndarray,
+        k: int,
+        weights: Optional[np.ndarray] = None,
+        n_iter: int = 10,
+        seed: int = 42,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        KMeans sphérique sur des vecteurs L2-normalisés
+        
+        Chaque itération est un produit matriciel X @ Cᵀ suivi d'un argmax
+        (affectation), puis un produit matriciel one-hot @ X (somme par
+        cluster) et une renormalisation des centroïdes.
+        """
+        rng = np.random.default_rng(seed)
+        n = X.shape[0]
+        if weights is None:
+            weights = np.ones(n, dtype=np.float32)
+        
+        # Initialisation k-means++ sur un échantillon d'au plus 128 points
+        sample = X[rng.choice(n, size=min(n, max(128, k)), replace=False)]
+        chosen = [int(rng.integers(len(sample)))]
+        # Distance cosinus, proportionnelle au carré de la distance euclidienne
+        closest = np.clip(1.0 - sample @ sample[chosen[0]], 0.0, None).astype(np.float64)
+        for _ in range(1, k):
+            total = closest.sum()
+            idx = (
+                int(rng.choice(len(sample), p=closest / total))
+                if total > 0 else int(rng.integers(len(sample)))
+            )
+            chosen.append(idx)
+            closest = np.minimum(closest, np.clip(1.0 - sample @ sample[idx], 0.0, None))
+        centroids = sample[chosen].copy()
+        
+        labels = None
+        membership = np.zeros((k, n), dtype=X.dtype)
+        rows = np.arange(n)
+        for _ in range(n_iter):
+            new_labels = (X @ centroids.T).argmax(axis=1)
+            if labels is not None and np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+            
+            membership.fill(0)
+            membership[labels, rows] = weights
+            sums = membership @ X
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Un cluster vide garde son centroïde précédent
+            non_empty = norms[:, 0] > 0
+            centroids[non_empty] = sums[non_empty] / norms[non_empty]
+        
+        return (X @ centroids.T).argmax(axis=1), centroids
+    
+    async def _analyze_cluster(self, texts: List[str]) -> Dict[str, Any]:
+        """Génère le label et les mots-clés d'un cluster via un seul appel LLM"""
+        # Exemples triés : même prompt (donc même clé) quel que soit l'ordre
+        examples_text = "\n".join(f"- {text[:100]}" for text in sorted(texts[:5]))
+        
         try:
             prompt = f"""
-                Analyse ces réponses d'élèves et génère un label court (2-4 mots) qui décrit le thème principal.
+                Analyse ces réponses d'élèves et identifie le thème principal.
 
                 Réponses:
                 {examples_text}
 
-                Label (2-4 mots uniquement, en français):
-            
+                Réponds uniquement en JSON, en français :
+                {{"label": "label court de 2-4 mots", "keywords": ["3 à 5 mots-clés principaux"]}}
             """
             
-            result = await self.langchain_service.llm.ainvoke(prompt)
-            label = result.content.strip()
+            cache_key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+            cached = _cluster_analysis_cache.get(cache_key)
+            if cached is not None:
+                _cluster_analysis_cache.move_to_end(cache_key)
+                return dict(cached, keywords=list(cached["keywords"]))
             
-            label = label.replace('"', '').replace("'", "").strip()
+            async with _llm_semaphore():
+                result = await self.langchain_service.json_chain.ainvoke(prompt)
             
-            return label[:50]
+            label = str(result.get("label", "")).replace('"', '').replace("'", "").strip()
+            keywords = [str(k).strip() for k in result.get("keywords", [])][:5]
             
-        except Exception as e:
-            app_logger.warning(f"Error generating cluster label: {e}")
-            return "Thème non identifié"
-    
-    async def _extract_keywords(self, texts: List[str]) -> List[str]:
-        """Extrait des mots-clés des textes"""
-        # Simplification: on pourrait utiliser du NLP plus avancé
-        # Pour l'instant, on retourne une liste vide ou on utilise le LLM
-        try:
-            combined_text = " ".join(texts[:5])
-            prompt = f"""
-                Extrais 3-5 mots-clés principaux de ces réponses d'élèves.
-
-                Réponses: {combined_text[:500]}
-
-                Mots-clés (séparés par des virgules, en français):
-            """
+            analysis = {
+                "label": label[:50] or "Thème non identifié",
+                "keywords": keywords,
+            }
             
-            result = await self.langchain_service.llm.ainvoke(prompt)
-            keywords_text = result.content.strip()
+            _cluster_analysis_cache[cache_key] = analysis
+            if len(_cluster_analysis_cache) > _CLUSTER_ANALYSIS_CACHE_SIZE:
+                _cluster_analysis_cache.popitem(last=False)
             
-            keywords = [k.strip() for k in keywords_text.split(",")][:5]
-            return keywords
+            return dict(analysis, keywords=list(keywords))
             
         except Exception as e:
-            app_logger.warning(f"Error extracting keywords: {e}")
-            return []
-
+            app_logger.warning(f"Error analyzing cluster: {e}")
+            return {"label": "Thème non identifié", "keywords": []}
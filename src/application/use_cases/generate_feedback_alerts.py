@@ -1,20 +1,26 @@
 from typing import List, Dict, Any, Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
 
 from src.application.facades.analysis_facade import AnalysisFacade
+from src.domain.repositories.analysis_cache_repository import IAnalysisCacheRepository
 from src.domain.entities.insight import InsightType, InsightPriority
 from src.core.logger import app_logger
 
+_ALERT_PRIORITIES = frozenset({"high", "urgent"})
+_ALERT_TYPES = frozenset({"alert", "negative"})
+
 class GenerateFeedbackAlertsUseCase:
     """Use case pour générer les alertes de feedback pour une matière"""
     
     def __init__(
         self,
         analysis_facade: AnalysisFacade,
+        cache_repo: Optional[IAnalysisCacheRepository] = None,
     ):
         self.analysis_facade = analysis_facade
+        self.cache_repo = cache_repo
     
     async def execute(
         self,
@@ -50,54 +56,134 @@ class GenerateFeedbackAlertsUseCase:
         
         all_insights = insights_data.get("insights", [])
         app_logger.info(
-            f"Found {len(all_insights)} insights for subject {subject_id}, form_type: {form_type}"
+            "Found {} insights for subject {}, form_type: {}",
+            len(all_insights), subject_id, form_type,
+        )
+        
+        # Une seule passe de filtrage, puis construction des alertes
+        alert_insights = [
+            insight for insight in all_insights
+            if insight.get("priority") in _ALERT_PRIORITIES
+            and insight.get("type") in _ALERT_TYPES
+        ]
+        app_logger.info(
+            "{}/{} insights will generate an alert",
+            len(alert_insights), len(all_insights),
         )
         
+        # Valeurs communes à toutes les alertes, calculées une seule fois
+        now = datetime.now()
+        now_iso = now.isoformat()
+        timestamp_str = str(int(now.timestamp()))
+        subject_bytes = str(subject_id).encode()
+        dedup_expires_at = now + timedelta(days=period_days)
+        
+        # Dédoublonnage par contenu : un même insight remonté deux fois ne
+        # produit qu'une alerte
+        unique_insights: Dict[str, Dict[str, Any]] = {}
+        for insight in alert_insights:
+            content_hash = self._content_hash(insight, subject_bytes)
+            unique_insights.setdefault(content_hash, insight)
+        
+        total = len(unique_insights)
         alerts = []
-        for idx, insight in enumerate(all_insights):
-            priority = insight.get("priority", "")
-            insight_type = insight.get("type", "")
-            
-            app_logger.info(
-                f"Insight {idx}: type={insight_type}, priority={priority}, will generate alert: {priority in ['high', 'urgent'] and insight_type in ['alert', 'negative']}"
+        for idx, (content_hash, insight) in enumerate(unique_insights.items()):
+            alert_id = await self._resolve_alert_id(
+                subject_id=subject_id,
+                content_hash=content_hash,
+                default_id=f"alert_{subject_id}_{content_hash}_{timestamp_str}",
+                expires_at=dedup_expires_at,
+            )
+            alerts.append(
+                self._build_alert(
+                    insight=insight,
+                    alert_id=alert_id,
+                    number=idx + 1,
+                    total=total,
+                    form_type=form_type,
+                    now_iso=now_iso,
+                )
             )
-            
-            if priority in ["high", "urgent"] and insight_type in ["alert", "negative"]:
-                evidence_list = insight.get("evidence", [])
-                evidence_strings = []
-                for ev in evidence_list:
-                    if isinstance(ev, dict):
-                        text = ev.get("text") or ev.get("example", "")
-                        if text:
-                            evidence_strings.append(text)
-                    elif isinstance(ev, str):
-                        evidence_strings.append(ev)
-                
-                title = insight.get("title", "")
-                content = insight.get("content", "")
-                content_hash = hashlib.md5(
-                    f"{title}{content}{subject_id}".encode()
-                ).hexdigest()[:8]
-                timestamp_str = str(int(datetime.now().timestamp()))
-                alert_id = f"alert_{subject_id}_{content_hash}_{timestamp_str}"
-                
-                alert_data = {
-                    "id": alert_id,
-                    "type": "negative" if insight_type == "negative" else "alert",
-                    "number": f"Alerte {len(alerts) + 1}/{len([i for i in all_insights if i.get('priority') in ['high', 'urgent']])}",
-                    "content": content,
-                    "title": title,
-                    "priority": priority,
-                    "evidence": evidence_strings,
-                    "timestamp": datetime.now().isoformat(),
-                }
-                
-                if form_type:
-                    alert_data["formType"] = form_type
-                
-                alerts.append(alert_data)
         
-        app_logger.info(f"Generated {len(alerts)} alerts for subject {subject_id}")
+        app_logger.info("Generated {} alerts for subject {}", len(alerts), subject_id)
         
         return alerts
-
+    
+    async def _resolve_alert_id(
+        self,
+        subject_id: UUID,
+        content_hash: str,
+        default_id: str,
+        expires_at: datetime,
+    ) -> str:
+        """
+        Identifiant stable d'une alerte sur la période
+        
+        Le hash du contenu (hors timestamp) sert d'identité : si la même
+        alerte a déjà été émise, son identifiant est réutilisé, ce qui rend
+        les appels répétés idempotents pour le frontend et le backend.
+        """
+        if self.cache_repo is None:
+            return default_id
+        
+        dedup_key = f"alert_dedup_{subject_id}_{content_hash}"
+        try:
+            cached = await self.cache_repo.get(dedup_key)
+            if cached:
+                return cached["alert_id"]
+            await self.cache_repo.set(dedup_key, {"alert_id": default_id}, expires_at)
+        except Exception as e:
+            app_logger.warning(f"Alert dedup cache unavailable: {e}")
+        return default_id
+    
+    def _build_alert(
+        self,
+        insight: Dict[str, Any],
+        alert_id: str,
+        number: int,
+        total: int,
+        form_type: Optional[str],
+        now_iso: str,
+    ) -> Dict[str, Any]:
+        """Formate un insight en alerte pour le frontend"""
+        title = insight.get("title", "")
+        content = insight.get("content", "")
+        
+        alert_data = {
+            "id": alert_id,
+            "type": "negative" if insight.get("type") == "negative" else "alert",
+            "number": f"Alerte {number}/{total}",
+            "content": content,
+            "title": title,
+            "priority": insight.get("priority", ""),
+            "evidence": [
+                text
+                for text in map(self._evidence_text, insight.get("evidence", []))
+                if text
+            ],
+            "timestamp": now_iso,
+        }
+        
+        if form_type:
+            alert_data["formType"] = form_type
+        
+        return alert_data
+    
+    @staticmethod
+    def _content_hash(insight: Dict[str, Any], subject_bytes: bytes) -> str:
+        """Hash du contenu d'un insight pour une matière (titre + contenu)"""
+        # Hachage incrémental : pas de chaîne intermédiaire titre+contenu+matière
+        hasher = hashlib.blake2b(digest_size=4)
+        hasher.update(insight.get("title", "").encode())
+        hasher.update(insight.get("content", "").encode())
+        hasher.update(subject_bytes)
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def _evidence_text(ev: Any) -> Optional[str]:
+        """Texte d'une preuve (dict issu des insights ou chaîne brute)"""
+        if isinstance(ev, dict):
+            return ev.get("text") or ev.get("example", "")
+        if isinstance(ev, str):
+            return ev
+        return None
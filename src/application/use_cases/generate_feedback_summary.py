@@ -1,4 +1,6 @@
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+from typing import Dict, Any, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 
@@ -10,6 +12,8 @@ from src.infrastructure.repositories.postgres_analysis_cache_repository import (
 from src.core.logger import app_logger
 from src.core.exceptions import InsufficientDataException
 
+_URGENT_PRIORITIES = frozenset({"high", "urgent"})
+
 class GenerateFeedbackSummaryUseCase:
     """Use case pour générer un résumé de feedback pour une matière"""
     
@@ -48,18 +52,12 @@ class GenerateFeedbackSummaryUseCase:
         """
         app_logger.info(f"Generating feedback summary for subject {subject_id}")
         
-        cache_key = f"feedback_summary_{subject_id}_{period_days}"
-        if use_cache:
-            cached = await self.cache_repo.get(cache_key)
-            if cached:
-                app_logger.info(f"Using cached summary for subject {subject_id}")
-                return cached
-        
         try:
             insights_data = await self.analysis_facade.generate_comprehensive_insights(
                 subject_id=subject_id,
                 period_days=period_days,
                 user_id=user_id,
+                use_cache=use_cache,
             )
         except InsufficientDataException as e:
             app_logger.warning(f"Insufficient data for summary: {e}")
@@ -69,8 +67,22 @@ class GenerateFeedbackSummaryUseCase:
                 "generated_at": datetime.now().isoformat(),
             }
         
-        summary = await self._generate_text_summary(insights_data)
-        full_summary = await self._generate_full_summary(insights_data)
+        # Clé adressée par le contenu : les insights sont eux-mêmes mis en
+        # cache par version des réponses, leur empreinte change dès qu'une
+        # nouvelle réponse arrive (pas de résumé périmé servi pendant le TTL)
+        fingerprint = hashlib.blake2b(
+            f"{insights_data.get('sentiment', {}).get('total_responses', 0)}"
+            f"_{insights_data.get('generated_at', '')}".encode(),
+            digest_size=8,
+        ).hexdigest()
+        cache_key = f"feedback_summary_{subject_id}_{period_days}_{fingerprint}"
+        if use_cache:
+            cached = await self.cache_repo.get(cache_key)
+            if cached:
+                app_logger.info(f"Using cached summary for subject {subject_id}")
+                return cached
+        
+        summary, full_summary = await self._generate_summaries(insights_data)
         
         result = {
             "summary": summary,
@@ -104,21 +116,77 @@ class GenerateFeedbackSummaryUseCase:
         else:
             return "très négatif"
     
-    async def _generate_text_summary(self, insights_data: Dict[str, Any]) -> str:
-        """Génère un résumé court (2-3 phrases)"""
+    def _prompt_context(self, insights_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Valeurs communes aux prompts de résumé, calculées une seule fois"""
         sentiment = insights_data.get("sentiment", {})
         themes = insights_data.get("themes", [])
         insights = insights_data.get("insights", [])
         
-        sentiment_score = sentiment.get('overall_score', 0)
-        sentiment_description = self._get_sentiment_description(sentiment_score)
+        return {
+            "sentiment_description": self._get_sentiment_description(
+                sentiment.get('overall_score', 0)
+            ),
+            "positive_pct": sentiment.get('positive_percentage', 0),
+            "negative_pct": sentiment.get('negative_percentage', 0),
+            "themes_count": len(themes),
+            "top_themes": ", ".join(t.get('label', '') for t in themes[:3]),
+            "insights_count": len(insights),
+            "actionable_count": sum(
+                1 for i in insights if i.get('priority') in _URGENT_PRIORITIES
+            ),
+        }
+    
+    async def _generate_summaries(self, insights_data: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Génère le résumé court et le résumé détaillé en un seul appel LLM
+        
+        Les deux résumés partagent le même contexte : un prompt unique
+        renvoyant un objet JSON évite de le faire traiter deux fois. Si la
+        réponse n'est pas exploitable, on revient aux deux prompts séparés.
+        """
+        ctx = self._prompt_context(insights_data)
         
+        prompt = f"""
+            Génère deux résumés des retours d'élèves pour cette matière.
+
+            Données:
+            - Sentiment global: {ctx['sentiment_description']}
+            - Distribution: {ctx['positive_pct']:.0f}% de retours positifs, {ctx['negative_pct']:.0f}% de retours négatifs
+            - Thèmes identifiés: {ctx['themes_count']}
+            - Thèmes principaux: {ctx['top_themes']}
+            - Insights: {ctx['insights_count']}
+            - Insights actionnables prioritaires: {ctx['actionable_count']}
+
+            Réponds uniquement en JSON, en français, factuel et actionnable :
+            {{"short": "résumé court (2-3 phrases)", "full": "résumé détaillé (paragraphe structuré)"}}
+            Note: Utilise un langage clair et accessible, ne mentionne pas de scores numériques de sentiment.
+        """
+        
+        try:
+            result = await self.langchain_service.json_chain.ainvoke(prompt)
+            summary = str(result.get("short", "")).strip()
+            full_summary = str(result.get("full", "")).strip()
+            if summary and full_summary:
+                return summary, full_summary
+            app_logger.warning("Incomplete combined summary, falling back to separate prompts")
+        except Exception as e:
+            app_logger.warning(f"Error generating combined summary, falling back to separate prompts: {e}")
+        
+        # Les deux résumés sont indépendants : appels LLM en parallèle
+        summary, full_summary = await asyncio.gather(
+            self._generate_text_summary(ctx),
+            self._generate_full_summary(ctx),
+        )
+        return summary, full_summary
+    
+    async def _generate_text_summary(self, ctx: Dict[str, Any]) -> str:
+        """Génère un résumé court (2-3 phrases)"""
         prompt = f"""
             Génère un résumé court (2-3 phrases) des retours d'élèves pour cette matière.
 
-            Sentiment global: {sentiment_description}
-            Thèmes identifiés: {len(themes)}
-            Insights: {len(insights)}
+            Sentiment global: {ctx['sentiment_description']}
+            Thèmes identifiés: {ctx['themes_count']}
+            Insights: {ctx['insights_count']}
 
             Résumé court (2-3 phrases, en français, factuel et actionnable):
             Note: Ne mentionne pas de scores numériques, utilise des descriptions qualitatives.
@@ -131,25 +199,16 @@ class GenerateFeedbackSummaryUseCase:
             app_logger.error(f"Error generating text summary: {e}")
             return "Résumé non disponible."
     
-    async def _generate_full_summary(self, insights_data: Dict[str, Any]) -> str:
+    async def _generate_full_summary(self, ctx: Dict[str, Any]) -> str:
         """Génère un résumé détaillé"""
-        sentiment = insights_data.get("sentiment", {})
-        themes = insights_data.get("themes", [])
-        insights = insights_data.get("insights", [])
-        
-        sentiment_score = sentiment.get('overall_score', 0)
-        sentiment_description = self._get_sentiment_description(sentiment_score)
-        positive_pct = sentiment.get('positive_percentage', 0)
-        negative_pct = sentiment.get('negative_percentage', 0)
-        
         prompt = f"""
             Génère un résumé détaillé des retours d'élèves pour cette matière.
 
             Données:
-            - Sentiment global: {sentiment_description}
-            - Distribution: {positive_pct:.0f}% de retours positifs, {negative_pct:.0f}% de retours négatifs
-            - Thèmes principaux: {', '.join([t.get('label', '') for t in themes[:3]])}
-            - Insights actionnables prioritaires: {len([i for i in insights if i.get('priority') in ['high', 'urgent']])}
+            - Sentiment global: {ctx['sentiment_description']}
+            - Distribution: {ctx['positive_pct']:.0f}% de retours positifs, {ctx['negative_pct']:.0f}% de retours négatifs
+            - Thèmes principaux: {ctx['top_themes']}
+            - Insights actionnables prioritaires: {ctx['actionable_count']}
 
             Résumé détaillé (paragraphe structuré, en français, factuel et actionnable):
             Note: Utilise un langage clair et accessible, évite les scores numériques de sentiment.
@@ -161,4 +220,3 @@ class GenerateFeedbackSummaryUseCase:
         except Exception as e:
             app_logger.error(f"Error generating full summary: {e}")
             return "Résumé détaillé non disponible."
-
@@ -1,10 +1,50 @@
-from typing import List, Dict, Any
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
 
+import numpy as np
+
+from src.configs import get_settings
 from src.domain.repositories.embedding_repository import IEmbeddingRepository
+from src.domain.repositories.analysis_cache_repository import IAnalysisCacheRepository
 from src.infrastructure.frameworks.embedding_service import EmbeddingService
 from src.core.logger import app_logger
 
+settings = get_settings()
+
+# Cache sémantique (process) des recherches : une requête identique une fois
+# normalisée est servie sans appel d'embedding, une requête quasi identique
+# (cosinus >= seuil avec une requête déjà vue) sans recherche pgvector
+_SEARCH_CACHE_SIZE = 1024
+_SEARCH_CACHE_TTL_SECONDS = 300
+_SEMANTIC_HIT_THRESHOLD = 0.97
+
+# Les embeddings sont déterministes pour un modèle donné : ceux des requêtes
+# sont conservés longtemps dans le cache persistant (analysis_cache)
+_QUERY_EMBEDDING_TTL = timedelta(days=7)
+
+# Résultats complets d'une recherche dans le cache persistant (partagé entre
+# workers) ; plus court que les embeddings car de nouvelles réponses arrivent
+_SEARCH_RESULTS_TTL = timedelta(minutes=30)
+
+# (matière, limit, seuil) -> requête normalisée -> (expiration, vecteur unitaire, résultats)
+_SearchScope = Tuple[str, int, float]
+_search_cache: "OrderedDict[Tuple[_SearchScope, str], Tuple[float, np.ndarray, List[Dict[str, Any]]]]" = (
+    OrderedDict()
+)
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
 class SemanticSearchUseCase:
     """Use case pour recherche sémantique dans les réponses"""
     
@@ -12,9 +52,13 @@ class SemanticSearchUseCase:
         self,
         embedding_repo: IEmbeddingRepository,
         embedding_service: EmbeddingService,
+        cache_repo: Optional[IAnalysisCacheRepository] = None,
+        results_ttl: timedelta = _SEARCH_RESULTS_TTL,
     ):
         self.embedding_repo = embedding_repo
         self.embedding_service = embedding_service
+        self.cache_repo = cache_repo
+        self.results_ttl = results_ttl
     
     async def execute(
         self,
@@ -37,7 +81,29 @@ class SemanticSearchUseCase:
         """
         app_logger.info(f"Semantic search: '{query[:50]}...' in subject {subject_id}")
         
-        query_embedding = await self.embedding_service.embed_text(query)
+        scope = (str(subject_id), limit, similarity_threshold)
+        normalized = _normalize_query(query)
+        
+        cached = self._cache_get(scope, normalized)
+        if cached is not None:
+            app_logger.debug(f"Semantic search cache hit (exact) for subject {subject_id}")
+            return cached
+        
+        results_key = self._results_cache_key(scope, normalized)
+        if self.cache_repo is not None:
+            cached = await self.cache_repo.get(results_key)
+            if cached is not None:
+                app_logger.debug(f"Semantic search cache hit (persistent) for subject {subject_id}")
+                return cached["results"]
+        
+        query_embedding = await self._embed_query(query, normalized)
+        query_unit = _unit(query_embedding)
+        
+        cached = self._cache_get_similar(scope, query_unit)
+        if cached is not None:
+            app_logger.debug(f"Semantic search cache hit (similar query) for subject {subject_id}")
+            self._cache_put(scope, normalized, query_unit, cached)
+            return cached
         
         results = await self.embedding_repo.find_similar(
             query_embedding=query_embedding,
@@ -60,4 +126,93 @@ class SemanticSearchUseCase:
         
         app_logger.info(f"Found {len(formatted_results)} similar responses")
         
-        return formatted_results
\ No newline at end of file
+        self._cache_put(scope, normalized, query_unit, formatted_results)
+        if self.cache_repo is not None:
+            await self.cache_repo.set(
+                results_key,
+                {"results": formatted_results},
+                datetime.now() + self.results_ttl,
+            )
+        
+        return formatted_results
+    
+    @staticmethod
+    def _results_cache_key(scope: _SearchScope, normalized: str) -> str:
+        subject_id, limit, similarity_threshold = scope
+        digest = hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return f"semsearch_{subject_id}_{limit}_{similarity_threshold:.2f}_{digest}"
+    
+    async def _embed_query(self, query: str, normalized: str) -> List[float]:
+        """Embedding de la requête, lu dans le cache persistant si possible"""
+        if self.cache_repo is None:
+            return await self.embedding_service.embed_text(query)
+        
+        digest = hashlib.blake2b(
+            f"{settings.EMBEDDING_MODEL}:{normalized}".encode(), digest_size=16
+        ).hexdigest()
+        cache_key = f"qemb_{digest}"
+        
+        cached = await self.cache_repo.get(cache_key)
+        if cached is not None:
+            return np.frombuffer(base64.b64decode(cached["embedding"]), dtype=np.float32).tolist()
+        
+        query_embedding = await self.embedding_service.embed_text(query)
+        encoded = base64.b64encode(np.asarray(query_embedding, dtype=np.float32).tobytes()).decode()
+        await self.cache_repo.set(
+            cache_key,
+            {"embedding": encoded},
+            datetime.now() + _QUERY_EMBEDDING_TTL,
+        )
+        return query_embedding
+    
+    @staticmethod
+    def _cache_get(scope: _SearchScope, normalized: str) -> Optional[List[Dict[str, Any]]]:
+        """Résultats en cache pour exactement la même requête normalisée"""
+        key = (scope, normalized)
+        entry = _search_cache.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, _, results = entry
+        if expires_at < time.monotonic():
+            del _search_cache[key]
+            return None
+        
+        _search_cache.move_to_end(key)
+        return results
+    
+    @staticmethod
+    def _cache_get_similar(
+        scope: _SearchScope,
+        query_unit: np.ndarray,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Résultats d'une requête déjà vue dont l'embedding est quasi identique"""
+        now = time.monotonic()
+        candidates = [
+            (vector, results)
+            for (entry_scope, _), (expires_at, vector, results) in _search_cache.items()
+            if entry_scope == scope and expires_at >= now and vector.shape == query_unit.shape
+        ]
+        if not candidates:
+            return None
+        
+        # Une seule multiplication matrice-vecteur pour toutes les requêtes en cache
+        similarities = np.stack([vector for vector, _ in candidates]) @ query_unit
+        best = int(np.argmax(similarities))
+        if similarities[best] < _SEMANTIC_HIT_THRESHOLD:
+            return None
+        
+        return candidates[best][1]
+    
+    @staticmethod
+    def _cache_put(
+        scope: _SearchScope,
+        normalized: str,
+        query_unit: np.ndarray,
+        results: List[Dict[str, Any]],
+    ) -> None:
+        key = (scope, normalized)
+        _search_cache[key] = (time.monotonic() + _SEARCH_CACHE_TTL_SECONDS, query_unit, results)
+        _search_cache.move_to_end(key)
+        if len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
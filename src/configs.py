@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
+from dataclasses import dataclass
 from functools import lru_cache
 from typing import List, Union
 import json
@@ -47,6 +48,7 @@ class Settings(BaseSettings):
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    DAILY_ANALYSIS_CONCURRENCY: int = 8
     
     # API
     API_V1_PREFIX: str = "/api/v1"
@@ -58,29 +60,19 @@ class Settings(BaseSettings):
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
     def parse_cors_origins(cls, v):
-        if v is None or v == "":
+        """Accepte une liste, un tableau JSON ou des valeurs séparées par des virgules"""
+        if isinstance(v, (list, tuple)):
+            return list(v) or ["http://localhost:3000"]
+        if not v or not isinstance(v, str):
             return ["http://localhost:3000"]
-        if isinstance(v, list):
-            return v
-        if isinstance(v, str):
-            # Try to parse as JSON first
-            try:
-                parsed = json.loads(v)
-                if isinstance(parsed, list):
-                    return parsed
-                return [parsed] if parsed else ["http://localhost:3000"]
-            except (json.JSONDecodeError, ValueError):
-                # If not JSON, try comma-separated values
-                origins = [origin.strip() for origin in v.split(",") if origin.strip()]
-                return origins if origins else ["http://localhost:3000"]
-        return v
-    
-    @field_validator("CORS_ORIGINS", mode="after")
-    @classmethod
-    def ensure_list(cls, v):
-        if isinstance(v, str):
-            return [v]
-        return v if isinstance(v, list) else ["http://localhost:3000"]
+        v = v.strip()
+        # Seul un tableau JSON est décodé : le cas courant (virgules) ne
+        # passe pas par json.loads et ne lève pas de JSONDecodeError
+        if v.startswith("["):
+            origins = json.loads(v)
+        else:
+            origins = [origin.strip() for origin in v.split(",") if origin.strip()]
+        return origins or ["http://localhost:3000"]
     
     # Service
     SERVICE_NAME: str = "izzzi-ai-service"
@@ -89,6 +81,30 @@ class Settings(BaseSettings):
     # Backend API (for report submission)
     BACKEND_URL: str = "http://localhost:3000/api"
 
+@dataclass(slots=True, frozen=True)
+class FrozenSettings:
+    """Instantané immuable de Settings une fois validé (accès par slots)"""
+    ENVIRONMENT: str
+    DEBUG: bool
+    LOG_LEVEL: str
+    DATABASE_URL: str
+    DATABASE_POOL_SIZE: int
+    DATABASE_MAX_OVERFLOW: int
+    JWT_SECRET: str
+    JWT_ALGORITHM: str
+    OPENAI_API_KEY: str
+    OPENAI_MODEL: str
+    EMBEDDING_MODEL: str
+    REDIS_URL: str
+    CELERY_BROKER_URL: str
+    CELERY_RESULT_BACKEND: str
+    DAILY_ANALYSIS_CONCURRENCY: int
+    API_V1_PREFIX: str
+    CORS_ORIGINS: List[str]
+    SERVICE_NAME: str
+    SERVICE_PORT: int
+    BACKEND_URL: str
+
 @lru_cache()
-def get_settings() -> Settings:
-    return Settings()
\ No newline at end of file
+def get_settings() -> FrozenSettings:
+    return FrozenSettings(**Settings().model_dump())
\ No newline at end of file
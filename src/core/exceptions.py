@@ -30,4 +30,9 @@ class InsufficientDataException(DomainException):
             message,
             "INSUFFICIENT_DATA",
             {"min_required": min_required, "actual": actual}
-        )
\ No newline at end of file
+        )
+
+class ServiceUnavailableException(DomainException):
+    """Service temporarily overloaded"""
+    def __init__(self, message: str = "Service unavailable", details: Optional[Any] = None):
+        super().__init__(message, "SERVICE_UNAVAILABLE", details)
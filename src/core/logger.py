@@ -7,21 +7,38 @@ settings = get_settings()
 def setup_logger():
     """Configure loguru"""
     logger.remove()
-    logger.add(
-        sys.stdout,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
-        level=settings.LOG_LEVEL,
-        colorize=True,
-    )
     
-    # Logging file in production
     if settings.ENVIRONMENT == "production":
+        # Production : JSON compact (pas de couleurs ni de template), écrit
+        # depuis un thread dédié pour ne pas bloquer l'event loop
+        # diagnose/backtrace désactivés : pas de capture des variables locales
+        # (coûteuse, et susceptible d'exposer des données) à chaque erreur
+        logger.add(
+            sys.stdout,
+            serialize=True,
+            level=settings.LOG_LEVEL,
+            enqueue=True,
+            backtrace=False,
+            diagnose=False,
+        )
         logger.add(
             "logs/ai_service_{time}.log",
+            serialize=True,
             rotation="500 MB",
             retention="10 days",
             level="INFO",
+            enqueue=True,
+            backtrace=False,
+            diagnose=False,
         )
+        return logger
+    
+    logger.add(
+        sys.stdout,
+        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
+        level=settings.LOG_LEVEL,
+        colorize=True,
+    )
     
     return logger
 
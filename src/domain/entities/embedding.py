@@ -3,7 +3,9 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID, uuid4
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class ResponseEmbedding:
     """Embedding for one student answer"""
     id: UUID = field(default_factory=uuid4)
@@ -15,9 +17,30 @@ class ResponseEmbedding:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
+    # Valeurs dérivées calculées à la demande (slots : pas de cached_property)
+    _response_id_str: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _unit_vector: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def response_id_str(self) -> str:
+        """response_id formaté une seule fois"""
+        if self._response_id_str is None:
+            self._response_id_str = str(self.response_id)
+        return self._response_id_str
+    
+    @property
+    def unit_vector(self) -> np.ndarray:
+        """Embedding normalisé (float32), calculé une seule fois"""
+        if self._unit_vector is None:
+            vec = np.asarray(self.embedding, dtype=np.float32)
+            norm = np.linalg.norm(vec)
+            self._unit_vector = vec / norm if norm else vec
+        return self._unit_vector
+    
     def similarity_to(self, other_embedding: List[float]) -> float:
         """Calcule la similarité cosinus"""
-        import numpy as np
-        a = np.array(self.embedding)
-        b = np.array(other_embedding)
-        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
\ No newline at end of file
+        other = np.asarray(other_embedding, dtype=np.float32)
+        norm = np.linalg.norm(other)
+        if not norm:
+            return 0.0
+        return float(self.unit_vector @ other) / float(norm)
@@ -16,7 +16,7 @@ class InsightPriority(str, Enum):
     HIGH = "high"
     URGENT = "urgent"
 
-@dataclass
+@dataclass(slots=True)
 class Insight:
     """Insight généré par l'IA"""
     id: UUID = field(default_factory=uuid4)
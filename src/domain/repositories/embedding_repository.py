@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
 
 from src.domain.entities.embedding import ResponseEmbedding
@@ -25,8 +26,19 @@ class IEmbeddingRepository(ABC):
         organization_id: Optional[UUID] = None,
         limit: int = 20,
         similarity_threshold: float = 0.7,
+        submitted_after: Optional[datetime] = None,
+        submitted_before: Optional[datetime] = None,
     ) -> List[Tuple[ResponseEmbedding, float]]:
-        """Vector search with pgvector"""
+        """Vector search with pgvector (optionally within a submission period)"""
+        pass
+    
+    @abstractmethod
+    def iter_by_subject(
+        self,
+        subject_id: UUID,
+        limit: int = 1000,
+    ) -> AsyncIterator[ResponseEmbedding]:
+        """Stream the embeddings of a subject (server-side cursor)"""
         pass
     
     @abstractmethod
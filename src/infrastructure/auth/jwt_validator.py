@@ -1,28 +1,84 @@
 from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+import jwt
+from jwt.exceptions import PyJWTError
 from pydantic import BaseModel, ValidationError
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from collections import OrderedDict
+import hashlib
+import time
 
 from src.core.logger import app_logger
 from src.configs import get_settings
 
+# Résolus une seule fois (la configuration est figée) : chaque requête
+# authentifiée ne fait plus qu'une lecture de variable globale
+_jwt_secret: Optional[str] = None
+_jwt_algorithms: Optional[List[str]] = None
+
 def get_jwt_secret() -> str:
     """Récupère le JWT_SECRET depuis la configuration"""
-    settings = get_settings()
-    if not settings.JWT_SECRET:
-        raise ValueError("JWT_SECRET environment variable is required")
-    return settings.JWT_SECRET
+    global _jwt_secret
+    if _jwt_secret is None:
+        secret = get_settings().JWT_SECRET
+        if not secret:
+            raise ValueError("JWT_SECRET environment variable is required")
+        _jwt_secret = secret
+    return _jwt_secret
 
 def get_jwt_algorithm() -> str:
     """Récupère le JWT_ALGORITHM depuis la configuration"""
-    settings = get_settings()
-    return settings.JWT_ALGORITHM
+    return _get_jwt_algorithms()[0]
+
+def _get_jwt_algorithms() -> List[str]:
+    """Liste des algorithmes acceptés, passée telle quelle à jwt.decode"""
+    global _jwt_algorithms
+    if _jwt_algorithms is None:
+        _jwt_algorithms = [get_settings().JWT_ALGORITHM]
+    return _jwt_algorithms
 
 
 security = HTTPBearer(auto_error=False)
 
+# Claims exigés dans tout token (JwtPayload NestJS)
+_REQUIRED_CLAIMS = ("sub", "userId", "username")
+_MAX_TOKEN_ROLES = 4
+
+# Cache LRU (process) des tokens déjà validés, indexé par le hash du token :
+# un client qui réutilise son bearer ne repaie ni la vérification de la
+# signature ni la validation Pydantic. Une entrée vit au plus
+# _TOKEN_CACHE_TTL_SECONDS et jamais au-delà de l'expiration du token ;
+# les échecs ne sont pas mis en cache.
+_TOKEN_CACHE_SIZE = 10_000
+_TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache: "OrderedDict[bytes, Tuple[float, TokenPayload]]" = OrderedDict()
+# Même principe pour le CurrentUser construit à partir du payload
+_user_cache: "OrderedDict[bytes, Tuple[float, CurrentUser]]" = OrderedDict()
+
+def _token_cache_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def _cache_get(cache: OrderedDict, key: bytes) -> Optional[Any]:
+    """Valeur en cache si elle n'a pas expiré"""
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    expires_at, value = cached
+    if expires_at <= time.time():
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return value
+
+def _cache_put(cache: OrderedDict, key: bytes, value: Any, exp: Optional[int]) -> None:
+    """Met en cache pour au plus le TTL, sans dépasser l'expiration du token"""
+    expires_at = time.time() + _TOKEN_CACHE_TTL_SECONDS
+    if exp:
+        expires_at = min(expires_at, exp)
+    cache[key] = (expires_at, value)
+    if len(cache) > _TOKEN_CACHE_SIZE:
+        cache.popitem(last=False)
+
 
 class TokenPayload(BaseModel):
     """
@@ -55,6 +111,33 @@ class CurrentUser(BaseModel):
     role: Optional[str] = None
 
 
+def _validate_token_dict(payload: Dict[str, Any]) -> TokenPayload:
+    """
+    Validation spécialisée du payload (forme fixe du JwtPayload NestJS)
+    
+    Payload signé et claims requis présents : si leurs types sont déjà les
+    bons, TokenPayload est construit sans passer par le schéma Pydantic.
+    Toute autre forme passe par la validation complète (ValidationError).
+    """
+    data = dict(payload)
+    roles = data.get("roles")
+    if isinstance(roles, list) and len(roles) > _MAX_TOKEN_ROLES:
+        # Seul le premier rôle est exploité : un token avec des milliers de
+        # rôles ne doit pas coûter plus cher à valider
+        data["roles"] = roles[:_MAX_TOKEN_ROLES]
+    
+    if (
+        all(type(data[claim]) is str for claim in _REQUIRED_CLAIMS)
+        and isinstance(data.get("roles", []), list)
+    ):
+        for claim in ("iat", "exp"):
+            if data.get(claim) is not None:
+                # PyJWT a déjà vérifié que ces claims sont numériques
+                data[claim] = int(data[claim])
+        return TokenPayload.model_construct(**data)
+    
+    return TokenPayload(**data)
+
 def decode_jwt(token: str) -> TokenPayload:
     """
     Décode et valide le JWT
@@ -67,21 +150,23 @@ def decode_jwt(token: str) -> TokenPayload:
     Raises:
         HTTPException: Si JWT invalide
     """
+    cache_key = _token_cache_key(token)
+    cached = _cache_get(_token_cache, cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        jwt_secret = get_jwt_secret()
-        jwt_algorithm = get_jwt_algorithm()
-        
         payload = jwt.decode(
             token,
-            jwt_secret,
-            algorithms=[jwt_algorithm]
+            get_jwt_secret(),
+            algorithms=_get_jwt_algorithms(),
+            options={"require": list(_REQUIRED_CLAIMS)},
         )
         
-        app_logger.info(f"JWT decoded successfully for user: {payload.get('sub')}")
-        app_logger.info(f"JWT payload keys: {list(payload.keys())}")
+        app_logger.debug("JWT decoded successfully for user: {}", payload.get('sub'))
         
         try:
-            token_data = TokenPayload(**payload)
+            token_data = _validate_token_dict(payload)
         except ValidationError as e:
             app_logger.error(f"Pydantic validation error: {e.errors()}")
             app_logger.error(f"Payload received: {payload}")
@@ -91,17 +176,11 @@ def decode_jwt(token: str) -> TokenPayload:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        if token_data.exp and token_data.exp < datetime.now().timestamp():
-            app_logger.warning(f"Expired JWT for user: {token_data.sub}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has expired",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        _cache_put(_token_cache, cache_key, token_data, token_data.exp)
         
         return token_data
         
-    except JWTError as e:
+    except PyJWTError as e:
         app_logger.error(f"JWT validation error: {e}")
         try:
             jwt_secret = get_jwt_secret()
@@ -166,7 +245,13 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    app_logger.info(f"Validating JWT: {token[:20]}... (length: {len(token)})")
+    # Bearer déjà vu récemment : ni décodage, ni construction de CurrentUser
+    cache_key = _token_cache_key(token)
+    cached_user = _cache_get(_user_cache, cache_key)
+    if cached_user is not None:
+        return cached_user
+    
+    app_logger.debug("Validating JWT (length: {})", len(token))
     
     try:
         payload = decode_jwt(token)
@@ -174,36 +259,45 @@ async def get_current_user(
         app_logger.error(f"JWT validation failed: {e.detail}")
         raise
     
-    organization_id_final = None
-    role_final = None
-    
-    if payload.roles and len(payload.roles) > 0:
+    organization_id_final = role_final = None
+    if payload.roles:
         first_role = payload.roles[0]
-        if isinstance(first_role, dict):
+        # roles n'est pas revalidé élément par élément (model_construct)
+        try:
             organization_id_final = first_role.get("organizationId")
             role_final = first_role.get("role")
+        except AttributeError:
+            pass
     
-    current_user = CurrentUser(
+    # Champs issus d'un payload déjà vérifié : pas de revalidation
+    current_user = CurrentUser.model_construct(
         id=payload.userId,
         email=payload.username,
         organization_id=organization_id_final,
         role=role_final,
     )
     
-    app_logger.info(f"User authenticated: {current_user.email} (ID: {current_user.id}, Org: {current_user.organization_id})")
+    app_logger.debug(
+        "User authenticated: {} (ID: {}, Org: {})",
+        current_user.email, current_user.id, current_user.organization_id,
+    )
+    
+    _cache_put(_user_cache, cache_key, current_user, payload.exp)
     
     return current_user
 
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Security(
-        HTTPBearer(auto_error=False)
-    )
+    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
 ) -> Optional[CurrentUser]:
     """
     Version optionnelle : n'échoue pas si pas de JWT
     Utile pour endpoints publics avec features premium si connecté
     """
-    if credentials is None:
+    # Pas de token, ou token qui n'a pas la forme header.payload.signature :
+    # inutile de tenter un décodage
+    if credentials is None or not credentials.credentials:
+        return None
+    if credentials.credentials.count(".") != 2:
         return None
     
     try:
@@ -1,3 +1,6 @@
+import asyncio
+from functools import lru_cache
+from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from src.configs import get_settings
@@ -11,6 +14,7 @@ engine = create_async_engine(
     pool_size=settings.DATABASE_POOL_SIZE,
     max_overflow=settings.DATABASE_MAX_OVERFLOW,
     pool_pre_ping=True,
+    pool_recycle=1800,
 )
 
 # Session factory
@@ -22,26 +26,36 @@ async_session_maker = async_sessionmaker(
 
 Base = declarative_base()
 
+def get_session_lock(session: AsyncSession) -> asyncio.Lock:
+    """
+    Verrou partagé par tous les repositories d'une même session.
+    AsyncSession n'autorise pas les opérations concurrentes : les use cases
+    lancés en parallèle (asyncio.gather) sérialisent ainsi leurs requêtes SQL
+    tandis que les appels LLM continuent de se chevaucher.
+    """
+    return session.info.setdefault("lock", asyncio.Lock())
+
 async def get_db_session() -> AsyncSession:
     """Dependency pour obtenir une session DB"""
+    # La fermeture est assurée par le context manager
     async with async_session_maker() as session:
         try:
             yield session
-        finally:
-            await session.close()
+            # Persiste les écritures de la requête (cache d'analyses notamment)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
 
-def create_celery_session_maker():
-    """
-    Crée un nouveau engine et session maker pour les tâches Celery.
-    Chaque appel asyncio.run() dans Celery a besoin de son propre engine
-    pour éviter les conflits d'event loop.
-    """
+@lru_cache(maxsize=1)
+def _celery_engine_and_session_maker():
+    # NullPool : aucune connexion n'est conservée entre deux tâches, l'engine
+    # peut donc être partagé par les asyncio.run() successifs de Celery sans
+    # conflit d'event loop (les connexions asyncpg sont liées à leur loop)
     celery_engine = create_async_engine(
         settings.DATABASE_URL,
         echo=settings.DEBUG,
-        pool_size=5,
-        max_overflow=10,
-        pool_pre_ping=True,
+        poolclass=NullPool,
     )
     
     session_maker = async_sessionmaker(
@@ -50,4 +64,12 @@ def create_celery_session_maker():
         expire_on_commit=False,
     )
     
-    return celery_engine, session_maker
\ No newline at end of file
+    return celery_engine, session_maker
+
+def create_celery_session_maker():
+    """
+    Engine et session maker pour les tâches Celery.
+    Construits une seule fois par process : l'engine n'a pas de pool, chaque
+    session ouvre sa connexion dans l'event loop de la tâche courante.
+    """
+    return _celery_engine_and_session_maker()
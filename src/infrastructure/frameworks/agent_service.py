@@ -1,17 +1,19 @@
-from typing import List, Dict, Any
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Dict, Any
 from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from src.configs import get_settings
+from src.infrastructure.frameworks.langchain_service import get_chat_model
 from src.infrastructure.frameworks.tools import (
     SentimentAnalysisTool,
     SemanticSearchTool,
     ClusterAnalysisTool,
 )
 from src.core.logger import app_logger
+from src.core.exceptions import ServiceUnavailableException
 
-settings = get_settings()
+_AGENT_ANSWER_TAG = "agent_answer"
 
 class TeacherAssistantAgent:
     """
@@ -33,11 +35,7 @@ class TeacherAssistantAgent:
         self.tools = [sentiment_tool, search_tool, cluster_tool]
         
         # LLM pour l'agent
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            temperature=0,  # Agent doit être déterministe
-            openai_api_key=settings.OPENAI_API_KEY,
-        )
+        self.llm = get_chat_model(temperature=0)  # Agent doit être déterministe
         
         # Prompt système pour l'agent
         self.prompt = ChatPromptTemplate.from_messages([
@@ -63,12 +61,13 @@ class TeacherAssistantAgent:
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
         
-        # Créer l'agent
+        # Créer l'agent ; le tag (hérité par son LLM) distingue en streaming
+        # les tokens de la réponse de ceux des LLM appelés par les outils
         self.agent = create_openai_tools_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt,
-        )
+        ).with_config(tags=[_AGENT_ANSWER_TAG])
         
         # Executor pour exécuter l'agent
         self.agent_executor = AgentExecutor(
@@ -101,44 +100,190 @@ class TeacherAssistantAgent:
             }
         """
         try:
-            enriched_input = f"""Question : {question}
-
-            Context :
-            - subject_id : {subject_id}
-            """
-            
-            if context:
-                enriched_input += f"- Informations additionnelles : {context}\n"
+            enriched_input = self._build_input(question, subject_id, context)
             
             app_logger.info(f"Agent processing query: {question[:100]}...")
             
             # Exécuter l'agent
             result = await self.agent_executor.ainvoke({"input": enriched_input})
             
-            # Extraire les outils utilisés
-            tools_used = []
-            for step in result.get("intermediate_steps", []):
-                if hasattr(step[0], "tool"):
-                    tools_used.append(step[0].tool)
+            formatted = self._format_result(result)
             
-            app_logger.info(f"Agent completed. Tools used: {tools_used}")
+            app_logger.info(f"Agent completed. Tools used: {formatted['tools_used']}")
             
-            return {
-                "answer": result["output"],
-                "tools_used": tools_used,
-                "intermediate_steps": [
-                    {
-                        "tool": step[0].tool if hasattr(step[0], "tool") else None,
-                        "input": step[0].tool_input if hasattr(step[0], "tool_input") else None,
-                        "output": str(step[1])[:200],  # Truncate
-                    }
-                    for step in result.get("intermediate_steps", [])
-                ],
-            }
+            return formatted
             
         except Exception as e:
             app_logger.error(f"Error in agent query: {e}")
             raise
+    
+    async def stream_query(
+        self,
+        question: str,
+        subject_id: str,
+        context: Dict[str, Any] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Pose une question à l'agent en streamant la réponse
+        
+        Yields:
+            {"type": "token", "value": str} pour chaque fragment généré,
+            puis {"type": "result", "answer": str, "tools_used": List[str],
+            "intermediate_steps": List[dict]} une fois l'agent terminé
+        """
+        try:
+            enriched_input = self._build_input(question, subject_id, context)
+            
+            app_logger.info(f"Agent streaming query: {question[:100]}...")
+            
+            async for event in self.agent_executor.astream_events(
+                {"input": enriched_input},
+                version="v2",
+            ):
+                kind = event["event"]
+                
+                if kind == "on_chat_model_stream":
+                    # Seul le LLM de l'agent alimente la réponse : les chaînes
+                    # appelées par les outils streament aussi (JSON brut)
+                    if _AGENT_ANSWER_TAG not in event.get("tags", ()):
+                        continue
+                    # Les appels d'outils produisent des fragments sans contenu
+                    content = event["data"]["chunk"].content
+                    if content:
+                        yield {"type": "token", "value": content}
+                
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    formatted = self._format_result(event["data"]["output"])
+                    app_logger.info(f"Agent completed. Tools used: {formatted['tools_used']}")
+                    yield {"type": "result", **formatted}
+            
+        except Exception as e:
+            app_logger.error(f"Error in agent stream: {e}")
+            raise
+    
+    def _build_input(
+        self,
+        question: str,
+        subject_id: str,
+        context: Dict[str, Any] = None,
+    ) -> str:
+        """Construit l'entrée enrichie envoyée à l'agent"""
+        enriched_input = f"""Question : {question}
+
+            Context :
+            - subject_id : {subject_id}
+            """
+        
+        if context:
+            enriched_input += f"- Informations additionnelles : {context}\n"
+        
+        return enriched_input
+    
+    def _format_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Extrait la réponse et les outils utilisés du résultat de l'executor"""
+        steps = result.get("intermediate_steps", [])
+        
+        return {
+            "answer": result["output"],
+            "tools_used": [step[0].tool for step in steps if hasattr(step[0], "tool")],
+            "intermediate_steps": [
+                {
+                    "tool": step[0].tool if hasattr(step[0], "tool") else None,
+                    "input": step[0].tool_input if hasattr(step[0], "tool_input") else None,
+                    "output": str(step[1])[:200],  # Truncate
+                }
+                for step in steps
+            ],
+        }
+
+class AgentAdmissionGate:
+    """
+    Limite le nombre de requêtes agent exécutées simultanément
+    
+    Partagée par tout le process : au-delà de `max_concurrent` requêtes en
+    cours, les suivantes attendent une place ; au-delà de `max_waiting`
+    requêtes en attente, elles sont refusées plutôt que mises en file.
+    """
+    
+    def __init__(self, max_concurrent: int = 8, max_waiting: int = 32):
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+    
+    async def acquire(self) -> Callable[[], None]:
+        """
+        Prend une place (en attendant si besoin) et retourne la fonction qui
+        la libère ; celle-ci peut être appelée plusieurs fois sans effet
+        
+        Raises:
+            ServiceUnavailableException: Si la file d'attente est pleine
+        """
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            app_logger.warning("Agent queue full, rejecting chatbot query")
+            raise ServiceUnavailableException(
+                "Too many chatbot queries in progress, please retry later"
+            )
+        
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        
+        released = False
+        
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._semaphore.release()
+        
+        return release
+    
+    @asynccontextmanager
+    async def slot(self):
+        release = await self.acquire()
+        try:
+            yield
+        finally:
+            release()
+
+class ThrottledAgentProxy:
+    """Expose l'interface de TeacherAssistantAgent derrière une AgentAdmissionGate"""
+    
+    def __init__(self, agent: TeacherAssistantAgent, gate: AgentAdmissionGate):
+        self.agent = agent
+        self.gate = gate
+    
+    async def query(
+        self,
+        question: str,
+        subject_id: str,
+        context: Dict[str, Any] = None,
+    ) -> Dict[str, Any]:
+        async with self.gate.slot():
+            return await self.agent.query(
+                question=question,
+                subject_id=subject_id,
+                context=context,
+            )
+    
+    def stream_query(
+        self,
+        question: str,
+        subject_id: str,
+        context: Dict[str, Any] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Non throttlé ici : pour une réponse streamée, l'admission doit être
+        décidée avant l'envoi des en-têtes, l'endpoint prend donc la place
+        lui-même (AgentAdmissionGate.acquire)
+        """
+        return self.agent.stream_query(
+            question=question,
+            subject_id=subject_id,
+            context=context,
+        )
 
 class ReportGeneratorAgent:
     """
@@ -159,11 +304,7 @@ class ReportGeneratorAgent:
     ):
         self.tools = [sentiment_tool, search_tool, cluster_tool]
         
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            temperature=0,
-            openai_api_key=settings.OPENAI_API_KEY,
-        )
+        self.llm = get_chat_model(temperature=0)
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", 
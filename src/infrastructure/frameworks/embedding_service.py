@@ -1,4 +1,9 @@
-from typing import List
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from tenacity import retry, stop_after_attempt, wait_exponential
 
@@ -7,14 +12,82 @@ from src.core.logger import app_logger
 
 settings = get_settings()
 
+# Cache LRU (process) des embeddings par hash du texte : réponses dupliquées
+# et requêtes répétées ne sont envoyées qu'une fois à l'API. Stockage en
+# float32 (~6 Ko par vecteur de 1536 dimensions).
+_EMBEDDING_CACHE_SIZE = 10_000
+_embedding_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+
+# Textes en cours d'embedding : les appels concurrents sur un même texte
+# attendent la même requête au lieu d'en lancer une seconde
+_inflight: Dict[bytes, asyncio.Future] = {}
+
+# Micro-batching entre requêtes : les textes absents du cache, quel que soit
+# l'appelant, sont regroupés pendant une courte fenêtre puis envoyés en un
+# seul appel à l'API (un aller-retour pour N requêtes concurrentes)
+_BATCH_WINDOW_SECONDS = 0.01
+_Batch = Dict[bytes, Tuple[str, asyncio.Future]]
+_open_batch: Optional[_Batch] = None
+_batch_tasks: Set[asyncio.Task] = set()
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(
+        f"{settings.EMBEDDING_MODEL}:{text}".encode(), digest_size=16
+    ).digest()
+
+def _cache_get(key: bytes) -> Optional[List[float]]:
+    vector = _embedding_cache.get(key)
+    if vector is None:
+        return None
+    _embedding_cache.move_to_end(key)
+    return vector.tolist()
+
+def _cache_put(key: bytes, embedding: List[float]) -> None:
+    _embedding_cache[key] = np.asarray(embedding, dtype=np.float32)
+    if len(_embedding_cache) > _EMBEDDING_CACHE_SIZE:
+        _embedding_cache.popitem(last=False)
+
+async def _flush_batch(embeddings: OpenAIEmbeddings, batch: _Batch) -> None:
+    """Envoie en un seul appel les textes accumulés dans `batch`"""
+    global _open_batch
+    try:
+        await asyncio.sleep(_BATCH_WINDOW_SECONDS)
+        if _open_batch is batch:
+            _open_batch = None
+        fresh = await embeddings.aembed_documents([text for text, _ in batch.values()])
+    except BaseException as e:
+        if _open_batch is batch:
+            _open_batch = None
+        for _, future in batch.values():
+            if future.done():
+                continue
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+        if not isinstance(e, Exception):
+            raise
+    else:
+        for (key, (_, future)), embedding in zip(batch.items(), fresh):
+            _cache_put(key, embedding)
+            future.set_result(embedding)
+    finally:
+        for key in batch:
+            _inflight.pop(key, None)
+
+@lru_cache(maxsize=1)
+def _get_embeddings() -> OpenAIEmbeddings:
+    """Client d'embeddings partagé par toutes les instances du service"""
+    return OpenAIEmbeddings(
+        model=settings.EMBEDDING_MODEL,
+        openai_api_key=settings.OPENAI_API_KEY,
+    )
+
 class EmbeddingService:
     """Service pour générer des embeddings via LangChain"""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            openai_api_key=settings.OPENAI_API_KEY,
-        )
+        self.embeddings = _get_embeddings()
     
     @retry(
         stop=stop_after_attempt(3),
@@ -23,7 +96,7 @@ class EmbeddingService:
     async def embed_text(self, text: str) -> List[float]:
         """Génère un embedding pour un texte"""
         try:
-            embedding = await self.embeddings.aembed_query(text)
+            embedding = (await self._embed_cached([text]))[0]
             app_logger.debug(f"Generated embedding for text (length: {len(text)})")
             return embedding
         except Exception as e:
@@ -37,9 +110,52 @@ class EmbeddingService:
     async def embed_batch(self, texts: List[str]) -> List[List[float]]:
         """Génère des embeddings en batch (plus efficace et moins cher)"""
         try:
-            embeddings = await self.embeddings.aembed_documents(texts)
+            embeddings = await self._embed_cached(texts)
             app_logger.info(f"Generated {len(embeddings)} embeddings in batch")
             return embeddings
         except Exception as e:
             app_logger.error(f"Error generating batch embeddings: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def _embed_cached(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeddings dans l'ordre de `texts`, en n'envoyant à l'API que les
+        textes uniques absents du cache et non déjà en cours de calcul ;
+        les textes manquants rejoignent le micro-batch partagé en cours
+        """
+        global _open_batch
+        keys = [_text_key(text) for text in texts]
+        results: Dict[bytes, List[float]] = {}
+        pending: Dict[bytes, asyncio.Future] = {}
+        misses: Dict[bytes, str] = {}
+        
+        for key, text in zip(keys, texts):
+            if key in results or key in pending or key in misses:
+                continue
+            cached = _cache_get(key)
+            if cached is not None:
+                results[key] = cached
+            elif key in _inflight:
+                pending[key] = _inflight[key]
+            else:
+                misses[key] = text
+        
+        if misses:
+            loop = asyncio.get_running_loop()
+            if _open_batch is None:
+                _open_batch = {}
+                task = loop.create_task(_flush_batch(self.embeddings, _open_batch))
+                _batch_tasks.add(task)
+                task.add_done_callback(_batch_tasks.discard)
+            for key, text in misses.items():
+                future = loop.create_future()
+                # Évite l'avertissement "exception never retrieved" sans attendant
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                _inflight[key] = pending[key] = future
+                _open_batch[key] = (text, future)
+        
+        for key, future in pending.items():
+            # shield : l'annulation d'un appelant n'annule pas le calcul partagé
+            results[key] = await asyncio.shield(future)
+        
+        return [results[key] for key in keys]
\ No newline at end of file
@@ -1,4 +1,7 @@
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Iterable, List, Dict, Any, Optional
+import orjson
+import tiktoken
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnablePassthrough
@@ -14,17 +17,98 @@ from src.core.logger import app_logger
 
 settings = get_settings()
 
+# Sérialisation des données injectées dans les prompts : JSON valide (mieux
+# compris par le LLM que le repr Python) et orjson plutôt que json
+_PROMPT_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _to_prompt_json(data: Any) -> str:
+    return orjson.dumps(data, default=str, option=_PROMPT_JSON_OPTIONS).decode()
+
+# Budgets (tokens) des blocs de réponses / contexte injectés dans les
+# prompts : le coût d'entrée reste borné quel que soit le volume de retours
+_RESPONSES_TOKEN_BUDGET = 6000
+_CONTEXT_TOKEN_BUDGET = 3000
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def warm_up_tokenizer() -> None:
+    """
+    Charge l'encodage tiktoken du modèle configuré (téléchargement du
+    fichier BPE au premier appel) : à appeler au démarrage, hors de la
+    boucle d'événements
+    """
+    _get_encoding(settings.OPENAI_MODEL)
+
+def fit_to_budget(
+    snippets: Iterable[str],
+    budget_tokens: int,
+    model: Optional[str] = None,
+) -> List[str]:
+    """
+    Premiers extraits, dans l'ordre, tant qu'ils tiennent dans le budget
+    
+    L'extrait qui dépasse est tronqué au budget restant (une longue réponse
+    en tête ne vide pas le bloc), puis on s'arrête.
+    """
+    encoding = _get_encoding(model or settings.OPENAI_MODEL)
+    kept = []
+    remaining = budget_tokens
+    for snippet in snippets:
+        # 2 tokens pour le séparateur et la puce ajoutés à la jonction
+        remaining -= 2
+        if remaining <= 0:
+            break
+        tokens = encoding.encode_ordinary(snippet)
+        if len(tokens) > remaining:
+            kept.append(encoding.decode(tokens[:remaining]))
+            break
+        kept.append(snippet)
+        remaining -= len(tokens)
+    return kept
+
+@lru_cache(maxsize=None)
+def get_chat_model(temperature: float = 0.7) -> ChatOpenAI:
+    """
+    Client ChatOpenAI partagé par température
+    
+    Les agents sont construits à chaque requête : partager le client évite
+    de réinitialiser le modèle et conserve les connexions keep-alive.
+    """
+    return ChatOpenAI(
+        model=settings.OPENAI_MODEL,
+        temperature=temperature,
+        openai_api_key=settings.OPENAI_API_KEY,
+    )
+
+@lru_cache(maxsize=256)
+def _chatbot_chain_for(subject_name: str, instructor_name: str):
+    """
+    Chaîne RAG avec la matière et l'enseignant déjà appliqués (partial),
+    construite une fois par conversation puis réutilisée à chaque tour
+    """
+    return CHATBOT_RAG_PROMPT.partial(
+        subject_name=subject_name,
+        instructor_name=instructor_name,
+    ) | get_chat_model(temperature=0.7)
+
 class LangChainService:
     """Service pour orchestration LLM via LangChain"""
     
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            temperature=0.7,
-            openai_api_key=settings.OPENAI_API_KEY,
-        )
+        self.llm = get_chat_model(temperature=0.7)
         
         self.json_parser = JsonOutputParser()
+        
+        # Chaînes construites une seule fois (pas de RunnableSequence par appel)
+        self.json_chain = self.llm | self.json_parser
+        self._sentiment_chain = SENTIMENT_ANALYSIS_PROMPT | self.json_chain
+        self._topics_chain = TOPIC_EXTRACTION_PROMPT | self.json_chain
+        self._insights_chain = INSIGHTS_GENERATION_PROMPT | self.json_chain
     
     async def analyze_sentiment(
         self,
@@ -32,16 +116,12 @@ class LangChainService:
         responses: List[str],
     ) -> Dict[str, Any]:
         """Analyse de sentiment avec LLM"""
-        chain = (
-            SENTIMENT_ANALYSIS_PROMPT
-            | self.llm
-            | self.json_parser
-        )
-        
         try:
-            result = await chain.ainvoke({
+            result = await self._sentiment_chain.ainvoke({
                 "subject_name": subject_name,
-                "responses": "\n\n".join([f"- {r}" for r in responses[:50]]),
+                "responses": "\n\n".join(
+                    f"- {r}" for r in fit_to_budget(responses[:50], _RESPONSES_TOKEN_BUDGET)
+                ),
             })
             
             app_logger.info(f"Sentiment analysis completed for {subject_name}")
@@ -55,15 +135,11 @@ class LangChainService:
         responses: List[str],
     ) -> Dict[str, Any]:
         """Extraction de thèmes via LLM"""
-        chain = (
-            TOPIC_EXTRACTION_PROMPT
-            | self.llm
-            | self.json_parser
-        )
-        
         try:
-            result = await chain.ainvoke({
-                "responses": "\n\n".join([f"- {r}" for r in responses[:50]]),
+            result = await self._topics_chain.ainvoke({
+                "responses": "\n\n".join(
+                    f"- {r}" for r in fit_to_budget(responses[:50], _RESPONSES_TOKEN_BUDGET)
+                ),
             })
             
             app_logger.info(f"Topic extraction completed")
@@ -82,20 +158,14 @@ class LangChainService:
         topics: Dict[str, Any],
     ) -> Dict[str, Any]:
         """Génération d'insights actionnables"""
-        chain = (
-            INSIGHTS_GENERATION_PROMPT
-            | self.llm
-            | self.json_parser
-        )
-        
         try:
-            result = await chain.ainvoke({
+            result = await self._insights_chain.ainvoke({
                 "subject_name": subject_name,
                 "instructor_name": instructor_name,
                 "period": period,
                 "response_count": response_count,
-                "sentiment_analysis": str(sentiment_analysis),
-                "topics": str(topics),
+                "sentiment_analysis": _to_prompt_json(sentiment_analysis),
+                "topics": _to_prompt_json(topics),
             })
             
             app_logger.info(f"Insights generated for {subject_name}")
@@ -112,17 +182,12 @@ class LangChainService:
         context: List[str],
     ) -> str:
         """Répond à une question via RAG"""
-        chain = (
-            CHATBOT_RAG_PROMPT
-            | self.llm
-        )
-        
         try:
-            result = await chain.ainvoke({
+            result = await _chatbot_chain_for(subject_name, instructor_name).ainvoke({
                 "query": query,
-                "subject_name": subject_name,
-                "instructor_name": instructor_name,
-                "context": "\n\n".join([f"Élève: {c}" for c in context]),
+                "context": "\n\n".join(
+                    f"Élève: {c}" for c in fit_to_budget(context, _CONTEXT_TOKEN_BUDGET)
+                ),
             })
             
             app_logger.info(f"Chatbot query processed: {query[:50]}...")
@@ -1,7 +1,29 @@
+import re
+from typing import List, Tuple
+
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
 
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+def _compact(text: str) -> str:
+    """
+    Retire l'indentation et les lignes vides superflues d'un message
+    
+    L'indentation des chaînes triple-quotées est envoyée telle quelle au
+    LLM : la supprimer réduit les tokens d'entrée à chaque appel sans
+    toucher au contenu (ni aux accolades du schéma JSON).
+    """
+    lines = (line.strip() for line in text.strip().splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+def _chat_prompt(messages: List[Tuple[str, str]]) -> ChatPromptTemplate:
+    """ChatPromptTemplate construit une seule fois, à partir de messages compactés"""
+    return ChatPromptTemplate.from_messages(
+        [(role, _compact(text)) for role, text in messages]
+    )
+
 # Template pour sentiment analysis
-SENTIMENT_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+SENTIMENT_ANALYSIS_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un expert en analyse de sentiment éducatif.
@@ -29,7 +51,7 @@ SENTIMENT_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 # Template pour topic extraction
-TOPIC_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
+TOPIC_EXTRACTION_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un expert en analyse thématique de feedbacks éducatifs.
@@ -51,7 +73,7 @@ TOPIC_EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 # Template pour insights generation
-INSIGHTS_GENERATION_PROMPT = ChatPromptTemplate.from_messages([
+INSIGHTS_GENERATION_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un conseiller pédagogique expert.
@@ -83,7 +105,7 @@ INSIGHTS_GENERATION_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 # Template pour chatbot RAG
-CHATBOT_RAG_PROMPT = ChatPromptTemplate.from_messages([
+CHATBOT_RAG_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un assistant pédagogique intelligent qui aide les enseignants 
@@ -110,7 +132,7 @@ CHATBOT_RAG_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 # Template pour comparative analysis
-COMPARATIVE_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+COMPARATIVE_ANALYSIS_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un analyste éducatif expert.
@@ -134,7 +156,7 @@ COMPARATIVE_ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 # Template pour predictive analysis
-RISK_PREDICTION_PROMPT = ChatPromptTemplate.from_messages([
+RISK_PREDICTION_PROMPT = _chat_prompt([
     ("system", 
     """
         Tu es un analyste prédictif en éducation.
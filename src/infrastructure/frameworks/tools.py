@@ -1,4 +1,6 @@
-from typing import Optional, Type
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Type
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field, ConfigDict
 from uuid import UUID
@@ -7,6 +9,30 @@ from src.application.use_cases.analyze_subject_sentiment import AnalyzeSubjectSe
 from src.application.use_cases.semantic_search import SemanticSearchUseCase
 from src.application.use_cases.cluster_responses import ClusterResponsesUseCase
 
+# Sorties formatées des tools (process), par (tool, arguments) : une boucle
+# d'agent qui rappelle un tool avec les mêmes arguments ne refait ni le
+# use case ni le formatage. TTL court, les données évoluent.
+_TOOL_CACHE_SIZE = 512
+_TOOL_CACHE_TTL_SECONDS = 120
+_tool_output_cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+
+def _tool_cache_get(key: Tuple) -> Optional[str]:
+    cached = _tool_output_cache.get(key)
+    if cached is None:
+        return None
+    expires_at, output = cached
+    if expires_at <= time.monotonic():
+        del _tool_output_cache[key]
+        return None
+    _tool_output_cache.move_to_end(key)
+    return output
+
+def _tool_cache_put(key: Tuple, output: str) -> str:
+    _tool_output_cache[key] = (time.monotonic() + _TOOL_CACHE_TTL_SECONDS, output)
+    if len(_tool_output_cache) > _TOOL_CACHE_SIZE:
+        _tool_output_cache.popitem(last=False)
+    return output
+
 # ==========================================
 # Pydantic schemas pour les tools
 # ==========================================
@@ -49,19 +75,23 @@ class SentimentAnalysisTool(BaseTool):
     
     async def _arun(self, subject_id: str, period_days: int = 30) -> str:
         """Exécution asynchrone"""
-        from uuid import UUID
+        key = (self.name, subject_id, period_days)
+        cached = _tool_cache_get(key)
+        if cached is not None:
+            return cached
+        
         result = await self.use_case.execute(
             subject_id=UUID(subject_id),
             period_days=period_days,
         )
         
-        return f"""Analyse de sentiment :
+        return _tool_cache_put(key, f"""Analyse de sentiment :
             - Score global : {result['overall_score']:.2f} ({result['label']})
             - Distribution : {result['positive_percentage']:.0f}% positif, {result['negative_percentage']:.0f}% négatif
             - Tendance : {result.get('trend_percentage', 'N/A')}
             - Points positifs : {', '.join(result.get('positive_points', [])[:3])}
             - Points négatifs : {', '.join(result.get('negative_points', [])[:3])}
-        """
+        """)
     
     def _run(self, subject_id: str, period_days: int = 30) -> str:
         """Fallback synchrone (non utilisé en async)"""
@@ -84,7 +114,11 @@ class SemanticSearchTool(BaseTool):
     
     async def _arun(self, query: str, subject_id: str, limit: int = 10) -> str:
         """Exécution asynchrone"""
-        from uuid import UUID
+        key = (self.name, query, subject_id, limit)
+        cached = _tool_cache_get(key)
+        if cached is not None:
+            return cached
+        
         results = await self.use_case.execute(
             query=query,
             subject_id=UUID(subject_id),
@@ -94,11 +128,12 @@ class SemanticSearchTool(BaseTool):
         if not results:
             return "Aucune réponse similaire trouvée."
         
-        output = f"Trouvé {len(results)} réponses pertinentes :\n\n"
-        for i, result in enumerate(results[:5], 1):
-            output += f"{i}. (Similarité: {result['similarity']:.2f}) {result['text'][:200]}...\n\n"
+        output = f"Trouvé {len(results)} réponses pertinentes :\n\n" + "".join(
+            f"{i}. (Similarité: {result['similarity']:.2f}) {result['text'][:200]}...\n\n"
+            for i, result in enumerate(results[:5], 1)
+        )
         
-        return output
+        return _tool_cache_put(key, output)
     
     def _run(self, query: str, subject_id: str, limit: int = 10) -> str:
         raise NotImplementedError("Use async version")
@@ -120,7 +155,11 @@ class ClusterAnalysisTool(BaseTool):
     
     async def _arun(self, subject_id: str, n_clusters: int = 5) -> str:
         """Exécution asynchrone"""
-        from uuid import UUID
+        key = (self.name, subject_id, n_clusters)
+        cached = _tool_cache_get(key)
+        if cached is not None:
+            return cached
+        
         result = await self.use_case.execute(
             subject_id=UUID(subject_id),
             n_clusters=n_clusters,
@@ -129,14 +168,15 @@ class ClusterAnalysisTool(BaseTool):
         if not result.get('clusters'):
             return "Pas assez de données pour identifier des thèmes."
         
-        output = f"Identifié {len(result['clusters'])} thèmes principaux :\n\n"
-        for cluster in result['clusters']:
-            output += f"Thème : {cluster['label']}\n"
-            output += f"- Mentions : {cluster['count']}\n"
-            output += f"- Sentiment : {cluster['sentiment']:.2f}\n"
-            output += f"- Exemples : {', '.join(cluster['examples'][:2])}\n\n"
+        output = f"Identifié {len(result['clusters'])} thèmes principaux :\n\n" + "".join(
+            f"Thème : {cluster['label']}\n"
+            f"- Mentions : {cluster['count']}\n"
+            f"- Sentiment : {cluster['sentiment']:.2f}\n"
+            f"- Exemples : {', '.join(cluster['examples'][:2])}\n\n"
+            for cluster in result['clusters']
+        )
         
-        return output
+        return _tool_cache_put(key, output)
     
     def _run(self, subject_id: str, n_clusters: int = 5) -> str:
         raise NotImplementedError("Use async version")
\ No newline at end of file
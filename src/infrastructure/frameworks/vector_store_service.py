@@ -1,5 +1,9 @@
+import hashlib
+import time
+from collections import OrderedDict
 from typing import List, Optional, Tuple
 from uuid import UUID
+import orjson
 from langchain_postgres import PGVector
 from langchain_core.documents import Document
 
@@ -8,6 +12,20 @@ from src.infrastructure.frameworks.embedding_service import EmbeddingService
 
 settings = get_settings()
 
+# Résultats des recherches de similarité (process), par hash de
+# (requête, k, filtre) : une question répétée ne refait ni l'embedding ni
+# le scan pgvector
+_SEARCH_CACHE_SIZE = 1024
+_SEARCH_CACHE_TTL_SECONDS = 600
+_search_cache: "OrderedDict[bytes, Tuple[float, List[Tuple[Document, float]]]]" = OrderedDict()
+
+def _search_key(query: str, k: int, filter: Optional[dict]) -> bytes:
+    return hashlib.blake2b(
+        query.encode() + b"|" + str(k).encode() + b"|"
+        + orjson.dumps(filter, option=orjson.OPT_SORT_KEYS, default=str),
+        digest_size=16,
+    ).digest()
+
 class VectorStoreService:
     """Service pour interagir avec pgvector via LangChain"""
     
@@ -43,11 +61,26 @@ class VectorStoreService:
         filter: Optional[dict] = None,
     ) -> List[Tuple[Document, float]]:
         """Recherche de similarité"""
-        results = await self.vector_store.asimilarity_search_with_score(
-            query,
+        key = _search_key(query, k, filter)
+        cached = _search_cache.get(key)
+        if cached is not None:
+            expires_at, results = cached
+            if expires_at > time.monotonic():
+                _search_cache.move_to_end(key)
+                return results
+            del _search_cache[key]
+        
+        # Embedding de la requête via le cache partagé d'EmbeddingService
+        query_embedding = await self.embedding_service.embed_text(query)
+        results = await self.vector_store.asimilarity_search_with_score_by_vector(
+            query_embedding,
             k=k,
             filter=filter,
         )
+        
+        _search_cache[key] = (time.monotonic() + _SEARCH_CACHE_TTL_SECONDS, results)
+        if len(_search_cache) > _SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
         return results
     
     async def max_marginal_relevance_search(
@@ -61,8 +94,9 @@ class VectorStoreService:
         MMR search pour diversité des résultats
         Évite les documents trop similaires entre eux
         """
-        results = await self.vector_store.amax_marginal_relevance_search(
-            query,
+        query_embedding = await self.embedding_service.embed_text(query)
+        results = await self.vector_store.amax_marginal_relevance_search_by_vector(
+            query_embedding,
             k=k,
             fetch_k=fetch_k,
             lambda_mult=lambda_mult,
@@ -1,10 +1,25 @@
 from celery import Celery
 from celery.schedules import crontab
 from datetime import timedelta
+from kombu.serialization import register
+import orjson
 from src.configs import get_settings
 
 settings = get_settings()
 
+# Sérialiseur orjson pour les messages et résultats de tâches (payloads
+# d'analyse volumineux) ; "json" reste accepté pour les messages déjà en file
+def _orjson_dumps(obj) -> str:
+    return orjson.dumps(obj, default=str).decode()
+
+register(
+    "orjson",
+    _orjson_dumps,
+    orjson.loads,
+    content_type="application/x-orjson",
+    content_encoding="utf-8",
+)
+
 celery_app = Celery(
     "izzzi-ai-tasks",
     broker=settings.CELERY_BROKER_URL,
@@ -17,9 +32,9 @@ celery_app = Celery(
 )
 
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer="orjson",
+    accept_content=["orjson", "json"],
+    result_serializer="orjson",
     timezone="Europe/Paris",
     enable_utc=True,
     task_track_started=True,
@@ -30,7 +45,7 @@ celery_app.conf.update(
 )
 
 celery_app.conf.beat_schedule = {
-    # Indexer les nouvelles réponses toutes les minutes (modifier pour toutes les heures en prod)
+    # Indexer les nouvelles réponses toutes les 5 heures
     "index-new-responses": {
         "task": "src.infrastructure.jobs.index_responses.index_new_responses_task",
         "schedule": crontab(minute=0, hour="*/5"),
@@ -1,13 +1,16 @@
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from sqlalchemy import text
 import httpx
 from collections import defaultdict
 import redis
 
 from src.infrastructure.jobs.celery_app import celery_app
-from src.infrastructure.database.connection import create_celery_session_maker
+from src.infrastructure.database.connection import (
+    create_celery_session_maker,
+    get_session_lock,
+)
 from src.infrastructure.repositories.postgres_response_repository import (
     PostgresResponseRepository
 )
@@ -95,93 +98,55 @@ async def daily_analysis_async() -> Dict[str, Any]:
             """)
             
             result = await session.execute(query)
-            subjects = result.fetchall()
             
-            if not subjects:
+            # Regroupement par organisation directement depuis le résultat,
+            # sans liste intermédiaire de toutes les lignes
+            subjects_by_org = defaultdict(list)
+            subject_count = 0
+            for subject in result:
+                subjects_by_org[str(subject.organization_id)].append(subject)
+                subject_count += 1
+            
+            if not subject_count:
                 app_logger.info("No active subjects with recent responses")
                 return {"subjects_analyzed": 0, "alerts_sent": 0, "skipped": 0}
             
-            app_logger.info(f"Found {len(subjects)} subjects to analyze")
+            app_logger.info(f"Found {subject_count} subjects to analyze")
             
             analyzed_count = 0
             total_alerts_sent = 0
             skipped_count = 0
             
-            subjects_by_org = defaultdict(list)
-            for subject in subjects:
-                subjects_by_org[str(subject.organization_id)].append(subject)
+            semaphore = asyncio.Semaphore(settings.DAILY_ANALYSIS_CONCURRENCY)
             
             for organization_id, org_subjects in subjects_by_org.items():
                 try:
                     facade = await create_facade_for_analysis(session)
-                    alerts_use_case = GenerateFeedbackAlertsUseCase(analysis_facade=facade)
+                    alerts_use_case = GenerateFeedbackAlertsUseCase(
+                        analysis_facade=facade,
+                        cache_repo=facade.cache_repo,
+                    )
                     
                     alerts_by_subject: Dict[str, Dict[str, Any]] = {}
                     
-                    for subject in org_subjects:
-                        subject_id_str = str(subject.subject_id)
-                        
-                        if not acquire_subject_lock(subject_id_str):
-                            app_logger.info(
-                                f"Subject {subject_id_str} already being processed by another worker, skipping"
-                            )
+                    # Matières traitées en parallèle (appels LLM qui se
+                    # chevauchent) ; les requêtes SQL restent sérialisées par
+                    # le verrou de session
+                    results = await asyncio.gather(*(
+                        _process_subject(session, alerts_use_case, subject, semaphore)
+                        for subject in org_subjects
+                    ))
+                    
+                    for subject, (all_alerts, skipped) in zip(org_subjects, results):
+                        if skipped:
                             skipped_count += 1
-                            continue
-                        
-                        try:
-                            subject_id = UUID(subject_id_str)
-                            
-                            form_types_query = text("""
-                                SELECT DISTINCT q.type
-                                FROM quizzes q
-                                WHERE q.subject_id = :subject_id
-                                AND q.type IN ('during_course', 'after_course')
-                            """)
-                            form_types_result = await session.execute(
-                                form_types_query,
-                                {"subject_id": subject_id_str}
-                            )
-                            form_types_rows = form_types_result.fetchall()
-                            available_form_types = [row[0] for row in form_types_rows]
-                            
-                            if not available_form_types:
-                                available_form_types = [None]
-                            
-                            all_alerts = []
-                            for form_type in available_form_types:
-                                app_logger.info(
-                                    f"Generating alerts for subject {subject_id_str} with form_type: {form_type}"
-                                )
-                                alerts = await alerts_use_case.execute(
-                                    subject_id=subject_id,
-                                    period_days=7,
-                                    form_type=form_type,
-                                )
-                                app_logger.info(
-                                    f"Generated {len(alerts)} alerts for subject {subject_id_str} with form_type: {form_type}"
-                                )
-                                if alerts:
-                                    app_logger.info(
-                                        f"Alert details: {[a.get('id') for a in alerts]}, formTypes: {[a.get('formType') for a in alerts]}"
-                                    )
-                                all_alerts.extend(alerts)
-                            
-                            app_logger.info(
-                                f"Total alerts for subject {subject_id_str}: {len(all_alerts)}"
-                            )
-                            if all_alerts:
-                                alerts_by_subject[subject_id_str] = {
-                                    'alerts': all_alerts,
-                                    'subject_name': subject.subject_name,
-                                    'organization_name': subject.organization_name,
-                                }
-                                analyzed_count += 1
-                                
-                        except Exception as e:
-                            app_logger.error(f"Error generating alerts for subject {subject_id_str}: {e}")
-                            continue
-                        finally:
-                            release_subject_lock(subject_id_str)
+                        elif all_alerts:
+                            alerts_by_subject[str(subject.subject_id)] = {
+                                'alerts': all_alerts,
+                                'subject_name': subject.subject_name,
+                                'organization_name': subject.organization_name,
+                            }
+                            analyzed_count += 1
                     
                     if alerts_by_subject:
                         for subject_id, alert_data in alerts_by_subject.items():
@@ -214,11 +179,89 @@ async def daily_analysis_async() -> Dict[str, Any]:
         await engine.dispose()
 
 
+async def _process_subject(
+    session,
+    alerts_use_case: GenerateFeedbackAlertsUseCase,
+    subject,
+    semaphore: asyncio.Semaphore,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Generate the alerts of one subject (every available form type)
+    
+    Returns (alerts, skipped): skipped is True when another worker holds the
+    subject's lock. Errors are logged and yield no alerts.
+    """
+    subject_id_str = str(subject.subject_id)
+    
+    async with semaphore:
+        if not acquire_subject_lock(subject_id_str):
+            app_logger.info(
+                f"Subject {subject_id_str} already being processed by another worker, skipping"
+            )
+            return [], True
+        
+        try:
+            subject_id = UUID(subject_id_str)
+            
+            form_types_query = text("""
+                SELECT DISTINCT q.type
+                FROM quizzes q
+                WHERE q.subject_id = :subject_id
+                AND q.type IN ('during_course', 'after_course')
+            """)
+            async with get_session_lock(session):
+                form_types_result = await session.execute(
+                    form_types_query,
+                    {"subject_id": subject_id_str}
+                )
+                form_types_rows = form_types_result.fetchall()
+            available_form_types = [row[0] for row in form_types_rows]
+            
+            if not available_form_types:
+                available_form_types = [None]
+            
+            all_alerts = []
+            for form_type in available_form_types:
+                app_logger.info(
+                    f"Generating alerts for subject {subject_id_str} with form_type: {form_type}"
+                )
+                alerts = await alerts_use_case.execute(
+                    subject_id=subject_id,
+                    period_days=7,
+                    form_type=form_type,
+                )
+                app_logger.info(
+                    f"Generated {len(alerts)} alerts for subject {subject_id_str} with form_type: {form_type}"
+                )
+                if alerts:
+                    # Listes construites seulement si le niveau INFO est émis
+                    app_logger.opt(lazy=True).info(
+                        "Alert details: {}, formTypes: {}",
+                        lambda: [a.get('id') for a in alerts],
+                        lambda: [a.get('formType') for a in alerts],
+                    )
+                all_alerts.extend(alerts)
+            
+            app_logger.info(
+                f"Total alerts for subject {subject_id_str}: {len(all_alerts)}"
+            )
+            return all_alerts, False
+            
+        except Exception as e:
+            app_logger.error(f"Error generating alerts for subject {subject_id_str}: {e}")
+            return [], False
+        finally:
+            release_subject_lock(subject_id_str)
+
+
 async def create_facade_for_analysis(session) -> AnalysisFacade:
     """Helper to create facade with dependencies"""
     from src.infrastructure.repositories.postgres_embedding_repository import (
         PostgresEmbeddingRepository
     )
+    from src.infrastructure.repositories.postgres_analysis_cache_repository import (
+        PostgresAnalysisCacheRepository
+    )
     from src.infrastructure.frameworks.embedding_service import EmbeddingService
     from src.infrastructure.frameworks.langchain_service import LangChainService
     from src.application.use_cases.analyze_subject_sentiment import (
@@ -237,6 +280,7 @@ async def create_facade_for_analysis(session) -> AnalysisFacade:
     # Create repositories
     response_repo = PostgresResponseRepository(session)
     embedding_repo = PostgresEmbeddingRepository(session)
+    cache_repo = PostgresAnalysisCacheRepository(session)
     
     # Create services (singletons)
     embedding_service = EmbeddingService()
@@ -247,11 +291,13 @@ async def create_facade_for_analysis(session) -> AnalysisFacade:
         response_repo=response_repo,
         embedding_repo=embedding_repo,
         langchain_service=langchain_service,
+        embedding_service=embedding_service,
     )
     
     semantic_search_uc = SemanticSearchUseCase(
         embedding_repo=embedding_repo,
         embedding_service=embedding_service,
+        cache_repo=cache_repo,
     )
     
     cluster_responses_uc = ClusterResponsesUseCase(
@@ -280,26 +326,45 @@ async def create_facade_for_analysis(session) -> AnalysisFacade:
         cluster_responses_uc=cluster_responses_uc,
         chatbot_query_uc=chatbot_query_uc,
         response_repo=response_repo,
+        cache_repo=cache_repo,
     )
     
     return facade
 
 
-async def save_analysis_to_cache(session, analysis: Dict[str, Any]):
-    """Save analysis to analysis_cache table"""
-    from src.infrastructure.database.models import AnalysisCacheModel
-    from datetime import datetime, timedelta
-    import json
+async def save_analyses_to_cache(session, analyses: List[Dict[str, Any]]):
+    """
+    Save analyses to analysis_cache table
+    
+    Single multi-row upsert on cache_key instead of one INSERT per subject
+    """
+    from sqlalchemy.dialects.postgresql import insert
+    from src.infrastructure.models import AnalysisCacheModel
+    
+    if not analyses:
+        return
     
-    cache_key = f"daily_analysis:{analysis['subject_id']}:{datetime.now().date()}"
+    today = datetime.now().date()
+    expires_at = datetime.now() + timedelta(days=7)
     
-    cache_entry = AnalysisCacheModel(
-        cache_key=cache_key,
-        cache_value=analysis,
-        expires_at=datetime.now() + timedelta(days=7),
+    stmt = insert(AnalysisCacheModel).values([
+        {
+            "cache_key": f"daily_analysis:{analysis['subject_id']}:{today}",
+            "cache_value": analysis,
+            "expires_at": expires_at,
+        }
+        for analysis in analyses
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AnalysisCacheModel.cache_key],
+        set_={
+            "cache_value": stmt.excluded.cache_value,
+            "expires_at": stmt.excluded.expires_at,
+        },
     )
     
-    session.add(cache_entry)
+    async with get_session_lock(session):
+        await session.execute(stmt)
 
 
 async def send_alert_to_backend(
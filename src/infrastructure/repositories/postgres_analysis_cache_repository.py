@@ -1,10 +1,12 @@
 from typing import Optional, Any
 from datetime import datetime
 from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.repositories.analysis_cache_repository import IAnalysisCacheRepository
 from src.infrastructure.models import AnalysisCacheModel
+from src.infrastructure.database.connection import get_session_lock
 from src.core.logger import app_logger
 
 class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
@@ -12,15 +14,27 @@ class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
     
+    async def _execute(self, query):
+        """Exécute une requête en sérialisant l'accès à la session partagée"""
+        async with get_session_lock(self.session):
+            return await self.session.execute(query)
+    
+    async def _flush(self):
+        """Flush sous le même verrou que les requêtes"""
+        async with get_session_lock(self.session):
+            await self.session.flush()
+    
     async def get(self, cache_key: str) -> Optional[Any]:
+        # populate_existing : set() écrit hors ORM, une ligne déjà chargée
+        # dans la session doit refléter la valeur upsertée
         query = select(AnalysisCacheModel).where(
             and_(
                 AnalysisCacheModel.cache_key == cache_key,
                 AnalysisCacheModel.expires_at > datetime.now()
             )
-        )
+        ).execution_options(populate_existing=True)
         
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         model = result.scalar_one_or_none()
         
         if model:
@@ -36,24 +50,21 @@ class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
         cache_value: Any,
         expires_at: datetime,
     ) -> bool:
-        query = select(AnalysisCacheModel).where(
-            AnalysisCacheModel.cache_key == cache_key
+        # Upsert en une requête : deux transactions concurrentes qui écrivent
+        # la même clé ne se heurtent plus à l'index unique sur cache_key
+        stmt = insert(AnalysisCacheModel).values(
+            cache_key=cache_key,
+            cache_value=cache_value,
+            expires_at=expires_at,
         )
-        result = await self.session.execute(query)
-        existing = result.scalar_one_or_none()
-        
-        if existing:
-            existing.cache_value = cache_value
-            existing.expires_at = expires_at
-        else:
-            model = AnalysisCacheModel(
-                cache_key=cache_key,
-                cache_value=cache_value,
-                expires_at=expires_at,
-            )
-            self.session.add(model)
-        
-        await self.session.flush()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalysisCacheModel.cache_key],
+            set_={
+                "cache_value": stmt.excluded.cache_value,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        await self._execute(stmt)
         app_logger.debug(f"Cached value for key: {cache_key}")
         return True
     
@@ -61,12 +72,12 @@ class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
         query = select(AnalysisCacheModel).where(
             AnalysisCacheModel.cache_key == cache_key
         )
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         model = result.scalar_one_or_none()
         
         if model:
             await self.session.delete(model)
-            await self.session.flush()
+            await self._flush()
             app_logger.debug(f"Deleted cache key: {cache_key}")
             return True
         
@@ -76,14 +87,14 @@ class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
         query = select(AnalysisCacheModel).where(
             AnalysisCacheModel.expires_at <= datetime.now()
         )
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         models = result.scalars().all()
         
         count = len(models)
         for model in models:
             await self.session.delete(model)
         
-        await self.session.flush()
+        await self._flush()
         
         if count > 0:
             app_logger.info(f"Cleared {count} expired cache entries")
@@ -98,7 +109,7 @@ class PostgresAnalysisCacheRepository(IAnalysisCacheRepository):
             )
         )
         
-        result = await self.session.execute(query)
+        result = await self._execute(query)
         model = result.scalar_one_or_none()
         
         return model is not None
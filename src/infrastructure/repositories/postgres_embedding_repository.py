@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
 from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +8,7 @@ import json
 from src.domain.entities.embedding import ResponseEmbedding
 from src.domain.repositories.embedding_repository import IEmbeddingRepository
 from src.infrastructure.models import ResponseEmbeddingModel
+from src.infrastructure.database.connection import get_session_lock
 from src.core.logger import app_logger
 
 class PostgresEmbeddingRepository(IEmbeddingRepository):
@@ -15,6 +16,11 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
     
+    async def _execute(self, query, params: Optional[dict] = None):
+        """Exécute une requête en sérialisant l'accès à la session partagée"""
+        async with get_session_lock(self.session):
+            return await self.session.execute(query, params)
+    
     async def save(self, embedding: ResponseEmbedding) -> ResponseEmbedding:
         model = ResponseEmbeddingModel(
             id=embedding.id,
@@ -57,6 +63,8 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
         organization_id: Optional[UUID] = None,
         limit: int = 20,
         similarity_threshold: float = 0.7,
+        submitted_after: Optional[datetime] = None,
+        submitted_before: Optional[datetime] = None,
     ) -> List[Tuple[ResponseEmbedding, float]]:
         """
         Recherche vectorielle avec pgvector
@@ -83,6 +91,14 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
             filters.append("s.organization_id = :organization_id")
             params["organization_id"] = str(organization_id)
         
+        if submitted_after:
+            filters.append("r.submitted_at >= :submitted_after")
+            params["submitted_after"] = submitted_after
+        
+        if submitted_before:
+            filters.append("r.submitted_at <= :submitted_before")
+            params["submitted_before"] = submitted_before
+        
         where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
         
         embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
@@ -109,46 +125,83 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
         
         app_logger.debug(f"Executing similarity search with {len(filters)} filters")
         
-        result = await self.session.execute(query, params)
+        result = await self._execute(query, params)
         rows = result.fetchall()
         
         app_logger.info(f"Found {len(rows)} similar embeddings")
         
-        results = []
-        for row in rows:
-            # Parse embedding from PostgreSQL vector type
-            # asyncpg returns vectors as strings like "[0.1, 0.2, 0.3, ...]"
-            if isinstance(row.embedding, str):
-                # Parse the string representation
-                embedding_list = json.loads(row.embedding)
-            elif isinstance(row.embedding, (list, tuple)):
+        return [(self._to_entity(row), float(row.similarity)) for row in rows]
+    
+    async def iter_by_subject(
+        self,
+        subject_id: UUID,
+        limit: int = 1000,
+    ) -> AsyncIterator[ResponseEmbedding]:
+        """
+        Embeddings d'une matière (les plus récents d'abord), sans calcul de
+        distance vectorielle ; lus via un curseur côté serveur et convertis
+        un à un, sans matérialiser la liste
+        
+        La session reste verrouillée pendant toute l'itération.
+        """
+        async with get_session_lock(self.session):
+            result = await self.session.stream(
+                self._subject_embeddings_query(),
+                {"subject_id": str(subject_id), "limit": limit},
+            )
+            async for row in result:
+                yield self._to_entity(row)
+    
+    def _subject_embeddings_query(self):
+        """Embeddings d'une matière, les plus récents d'abord"""
+        return text("""
+            SELECT 
+                re.id,
+                re.response_id,
+                re.answer_id,
+                re.text_content,
+                re.embedding,
+                re.metadata as metadata,
+                re.created_at,
+                re.updated_at
+            FROM response_embeddings re
+            JOIN responses r ON r.id = re.response_id
+            JOIN quizzes q ON q.id = r.quiz_id
+            WHERE q.subject_id = :subject_id
+            ORDER BY re.created_at DESC
+            LIMIT :limit
+        """)
+    
+    def _to_entity(self, row) -> ResponseEmbedding:
+        """Convertit une ligne response_embeddings en entité"""
+        # Parse embedding from PostgreSQL vector type
+        # asyncpg returns vectors as strings like "[0.1, 0.2, 0.3, ...]"
+        if isinstance(row.embedding, str):
+            # Parse the string representation
+            embedding_list = json.loads(row.embedding)
+        elif isinstance(row.embedding, (list, tuple)):
+            embedding_list = list(row.embedding)
+        else:
+            # Fallback: try to convert to list
+            try:
                 embedding_list = list(row.embedding)
-            else:
-                # Fallback: try to convert to list
-                try:
-                    embedding_list = list(row.embedding)
-                except (TypeError, ValueError) as e:
-                    app_logger.error(
-                        f"Failed to parse embedding for row {row.id}: {type(row.embedding)} - {e}"
-                    )
-                    # Use zero vector as fallback
-                    embedding_list = [0.0] * 1536
-            
-            results.append((
-                ResponseEmbedding(
-                    id=row.id,
-                    response_id=row.response_id,
-                    answer_id=row.answer_id,
-                    text_content=row.text_content,
-                    embedding=embedding_list,
-                    metadata=row.metadata or {},
-                    created_at=row.created_at,
-                    updated_at=row.updated_at,
-                ),
-                float(row.similarity)
-            ))
-        
-        return results
+            except (TypeError, ValueError) as e:
+                app_logger.error(
+                    f"Failed to parse embedding for row {row.id}: {type(row.embedding)} - {e}"
+                )
+                # Use zero vector as fallback
+                embedding_list = [0.0] * 1536
+        
+        return ResponseEmbedding(
+            id=row.id,
+            response_id=row.response_id,
+            answer_id=row.answer_id,
+            text_content=row.text_content,
+            embedding=embedding_list,
+            metadata=row.metadata or {},
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
     
     async def get_unindexed_responses(
         self,
@@ -173,7 +226,7 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
             LIMIT :limit
         """)
         
-        result = await self.session.execute(query, {"limit": limit})
+        result = await self._execute(query, {"limit": limit})
         rows = result.fetchall()
         
         return [
@@ -196,5 +249,5 @@ class PostgresEmbeddingRepository(IEmbeddingRepository):
             WHERE q.subject_id = :subject_id
         """)
         
-        result = await self.session.execute(query, {"subject_id": str(subject_id)})
+        result = await self._execute(query, {"subject_id": str(subject_id)})
         return result.scalar()
\ No newline at end of file
@@ -4,6 +4,7 @@ from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
+from src.infrastructure.database.connection import get_session_lock
 from src.core.logger import app_logger
 
 class PostgresResponseRepository:
@@ -11,6 +12,11 @@ class PostgresResponseRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
     
+    async def _execute(self, query, params: Optional[dict] = None):
+        """Exécute une requête en sérialisant l'accès à la session partagée"""
+        async with get_session_lock(self.session):
+            return await self.session.execute(query, params)
+    
     async def get_text_responses_by_subject(
         self,
         subject_id: UUID,
@@ -55,7 +61,7 @@ class PostgresResponseRepository:
             ORDER BY r.submitted_at DESC
         """)
         
-        result = await self.session.execute(query, params)
+        result = await self._execute(query, params)
         rows = result.fetchall()
         
         return [dict(row._mapping) for row in rows]
@@ -90,9 +96,47 @@ class PostgresResponseRepository:
             ORDER BY qt.category, a.value_stars
         """)
         
-        result = await self.session.execute(query, params)
+        result = await self._execute(query, params)
         return [dict(row._mapping) for row in result.fetchall()]
     
+    async def get_responses_version(self, subject_id: UUID) -> str:
+        """
+        Signature de l'état des réponses d'une matière
+        Change dès qu'une réponse est ajoutée ou supprimée, et dès que ses
+        embeddings sont indexés (job différé) : thèmes et preuves en dépendent
+        """
+        query = text("""
+            SELECT
+                rs.response_count,
+                rs.last_submitted_at,
+                es.embedding_count,
+                es.last_embedded_at
+            FROM (
+                SELECT
+                    COUNT(r.id) as response_count,
+                    MAX(r.submitted_at) as last_submitted_at
+                FROM responses r
+                JOIN quizzes q ON q.id = r.quiz_id
+                WHERE q.subject_id = :subject_id
+            ) rs
+            CROSS JOIN (
+                SELECT
+                    COUNT(re.id) as embedding_count,
+                    MAX(re.created_at) as last_embedded_at
+                FROM response_embeddings re
+                JOIN responses r ON r.id = re.response_id
+                JOIN quizzes q ON q.id = r.quiz_id
+                WHERE q.subject_id = :subject_id
+            ) es
+        """)
+        
+        result = await self._execute(query, {"subject_id": str(subject_id)})
+        row = result.fetchone()
+        
+        last_submitted_at = row.last_submitted_at.isoformat() if row.last_submitted_at else ""
+        last_embedded_at = row.last_embedded_at.isoformat() if row.last_embedded_at else ""
+        return f"{row.response_count}:{last_submitted_at}:{row.embedding_count}:{last_embedded_at}"
+    
     async def get_response_count_by_subject(
         self,
         subject_id: UUID,
@@ -106,7 +150,7 @@ class PostgresResponseRepository:
               AND r.submitted_at >= NOW() - INTERVAL ':days days'
         """)
         
-        result = await self.session.execute(
+        result = await self._execute(
             query, 
             {"subject_id": str(subject_id), "days": period_days}
         )
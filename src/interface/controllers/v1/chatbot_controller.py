@@ -1,10 +1,16 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
 from src.interface.dto.analysis_dto import ChatbotQueryRequest, ChatbotResponse
-from src.interface.dependencies import get_analysis_facade
+from src.interface.dependencies import get_analysis_facade, get_agent_gate
+from src.infrastructure.frameworks.agent_service import AgentAdmissionGate
 from src.application.facades.analysis_facade import AnalysisFacade
 from src.infrastructure.auth.jwt_validator import get_current_user, CurrentUser
 from src.core.logger import app_logger
+from src.core.exceptions import ServiceUnavailableException
 from uuid import UUID
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
@@ -41,9 +47,58 @@ async def chatbot_query(
         
         return result
         
+    except ServiceUnavailableException:
+        raise
     except Exception as e:
         app_logger.error(f"Error in chatbot query: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while processing your question"
-        )
\ No newline at end of file
+        )
+
+@router.post("/query/stream")
+async def chatbot_query_stream(
+    request: ChatbotQueryRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    facade: AnalysisFacade = Depends(get_analysis_facade),
+    gate: AgentAdmissionGate = Depends(get_agent_gate),
+):
+    """
+    Variante streamée de /query (Server-Sent Events)
+    
+    Émet un événement `{"type": "token", "value": ...}` par fragment de
+    réponse, puis un événement final `{"type": "result", ...}` au format
+    de ChatbotResponse.
+    """
+    app_logger.info(f"Chatbot streaming query from user {current_user.id}: {request.query[:100]}...")
+    
+    # Place prise avant de renvoyer la StreamingResponse : une surcharge
+    # remonte en 503 (ServiceUnavailableException) et non en 200 + événement
+    # d'erreur une fois les en-têtes envoyés
+    release_slot = await gate.acquire()
+    
+    async def event_stream():
+        try:
+            async for chunk in facade.chatbot_conversation_stream(
+                query=request.query,
+                subject_id=request.subject_id,
+                user_id=UUID(current_user.id),
+                context=request.context,
+            ):
+                yield f"data: {json.dumps(chunk, default=str)}\n\n"
+        except Exception as e:
+            app_logger.error(f"Error in chatbot stream: {e}")
+            error = {
+                "type": "error",
+                "detail": "An error occurred while processing your question",
+            }
+            yield f"data: {json.dumps(error)}\n\n"
+        finally:
+            release_slot()
+    
+    # Filet de sécurité si le flux n'est jamais itéré (déconnexion précoce)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        background=BackgroundTask(release_slot),
+    )
@@ -14,7 +14,6 @@ from src.infrastructure.frameworks.langchain_service import LangChainService
 from src.infrastructure.repositories.postgres_analysis_cache_repository import (
     PostgresAnalysisCacheRepository
 )
-from src.infrastructure.database.connection import get_db_session
 from src.infrastructure.auth.jwt_validator import get_current_user, CurrentUser
 from src.core.logger import app_logger
 from src.core.exceptions import InsufficientDataException
@@ -22,12 +21,7 @@ from src.core.exceptions import InsufficientDataException
 router = APIRouter(prefix="/feedback", tags=["Feedback"])
 
 # Dependencies supplémentaires
-from src.interface.dependencies import get_langchain_service
-
-async def get_cache_repository(
-    session = Depends(get_db_session)
-) -> PostgresAnalysisCacheRepository:
-    return PostgresAnalysisCacheRepository(session)
+from src.interface.dependencies import get_langchain_service, get_cache_repository
 
 # Dependency pour GenerateFeedbackSummaryUseCase
 async def get_feedback_summary_use_case(
@@ -44,8 +38,12 @@ async def get_feedback_summary_use_case(
 # Dependency pour GenerateFeedbackAlertsUseCase
 async def get_feedback_alerts_use_case(
     analysis_facade: AnalysisFacade = Depends(get_analysis_facade),
+    cache_repo: PostgresAnalysisCacheRepository = Depends(get_cache_repository),
 ) -> GenerateFeedbackAlertsUseCase:
-    return GenerateFeedbackAlertsUseCase(analysis_facade=analysis_facade)
+    return GenerateFeedbackAlertsUseCase(
+        analysis_facade=analysis_facade,
+        cache_repo=cache_repo,
+    )
 
 @router.get("/subjects/{subject_id}/summary")
 async def get_feedback_summary(
@@ -153,6 +151,7 @@ async def trigger_analysis(
             subject_id=subject_id,
             period_days=period_days,
             user_id=UUID(current_user.id),
+            use_cache=False,
         )
         
         return {
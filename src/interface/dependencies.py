@@ -9,9 +9,16 @@ from src.infrastructure.repositories.postgres_embedding_repository import (
 from src.infrastructure.repositories.postgres_response_repository import (
     PostgresResponseRepository
 )
+from src.infrastructure.repositories.postgres_analysis_cache_repository import (
+    PostgresAnalysisCacheRepository
+)
 from src.infrastructure.frameworks.embedding_service import EmbeddingService
 from src.infrastructure.frameworks.langchain_service import LangChainService
-from src.infrastructure.frameworks.agent_service import TeacherAssistantAgent
+from src.infrastructure.frameworks.agent_service import (
+    TeacherAssistantAgent,
+    AgentAdmissionGate,
+    ThrottledAgentProxy,
+)
 from src.infrastructure.frameworks.tools import (
     SentimentAnalysisTool,
     SemanticSearchTool,
@@ -28,6 +35,7 @@ from src.infrastructure.auth.jwt_validator import get_current_user, CurrentUser
 
 _embedding_service = None
 _langchain_service = None
+_agent_gate = None
 
 def get_embedding_service() -> EmbeddingService:
     """Singleton pour EmbeddingService"""
@@ -43,6 +51,13 @@ def get_langchain_service() -> LangChainService:
         _langchain_service = LangChainService()
     return _langchain_service
 
+def get_agent_gate() -> AgentAdmissionGate:
+    """Singleton pour AgentAdmissionGate (partagée entre les requêtes)"""
+    global _agent_gate
+    if _agent_gate is None:
+        _agent_gate = AgentAdmissionGate()
+    return _agent_gate
+
 # === Repositories ===
 
 async def get_embedding_repository(
@@ -55,26 +70,35 @@ async def get_response_repository(
 ) -> PostgresResponseRepository:
     return PostgresResponseRepository(session)
 
+async def get_cache_repository(
+    session: AsyncSession = Depends(get_db_session)
+) -> PostgresAnalysisCacheRepository:
+    return PostgresAnalysisCacheRepository(session)
+
 # === Use Cases ===
 
 async def get_analyze_sentiment_use_case(
     response_repo: PostgresResponseRepository = Depends(get_response_repository),
     embedding_repo: PostgresEmbeddingRepository = Depends(get_embedding_repository),
     langchain_service: LangChainService = Depends(get_langchain_service),
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
 ) -> AnalyzeSubjectSentimentUseCase:
     return AnalyzeSubjectSentimentUseCase(
         response_repo=response_repo,
         embedding_repo=embedding_repo,
         langchain_service=langchain_service,
+        embedding_service=embedding_service,
     )
 
 async def get_semantic_search_use_case(
     embedding_repo: PostgresEmbeddingRepository = Depends(get_embedding_repository),
     embedding_service: EmbeddingService = Depends(get_embedding_service),
+    cache_repo: PostgresAnalysisCacheRepository = Depends(get_cache_repository),
 ) -> SemanticSearchUseCase:
     return SemanticSearchUseCase(
         embedding_repo=embedding_repo,
         embedding_service=embedding_service,
+        cache_repo=cache_repo,
     )
 
 async def get_cluster_responses_use_case(
@@ -104,8 +128,9 @@ async def get_teacher_assistant_agent(
 
 async def get_chatbot_query_use_case(
     agent: TeacherAssistantAgent = Depends(get_teacher_assistant_agent),
+    gate: AgentAdmissionGate = Depends(get_agent_gate),
 ) -> ChatbotQueryUseCase:
-    return ChatbotQueryUseCase(agent=agent)
+    return ChatbotQueryUseCase(agent=ThrottledAgentProxy(agent=agent, gate=gate))
 
 # === Facade ===
 
@@ -115,6 +140,7 @@ async def get_analysis_facade(
     cluster_responses_uc: ClusterResponsesUseCase = Depends(get_cluster_responses_use_case),
     chatbot_query_uc: ChatbotQueryUseCase = Depends(get_chatbot_query_use_case),
     response_repo: PostgresResponseRepository = Depends(get_response_repository),
+    cache_repo: PostgresAnalysisCacheRepository = Depends(get_cache_repository),
 ) -> AnalysisFacade:
     return AnalysisFacade(
         analyze_sentiment_uc=analyze_sentiment_uc,
@@ -122,4 +148,5 @@ async def get_analysis_facade(
         cluster_responses_uc=cluster_responses_uc,
         chatbot_query_uc=chatbot_query_uc,
         response_repo=response_repo,
+        cache_repo=cache_repo,
     )
\ No newline at end of file
@@ -9,6 +9,7 @@ from src.core.exceptions import (
     ValidationException,
     UnauthorizedException,
     InsufficientDataException,
+    ServiceUnavailableException,
 )
 from src.core.logger import app_logger
 
@@ -40,6 +41,8 @@ def add_exception_handlers(app: FastAPI):
             status_code = status.HTTP_401_UNAUTHORIZED
         elif isinstance(exc, InsufficientDataException):
             status_code = status.HTTP_400_BAD_REQUEST
+        elif isinstance(exc, ServiceUnavailableException):
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
         
         return JSONResponse(
             status_code=status_code,
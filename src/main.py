@@ -1,10 +1,12 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 
 from src.configs import get_settings
 from src.core.logger import setup_logger
+from src.infrastructure.frameworks.langchain_service import warm_up_tokenizer
 from src.interface.controllers.v1 import analysis, chatbot, search, feedback
 from src.interface.middlewares.error_handler import add_exception_handlers, LoggingMiddleware
 
@@ -20,7 +22,9 @@ async def lifespan(app: FastAPI):
     logger.info(f"Debug mode: {settings.DEBUG}")
     
     # TODO: Initialize database connection pool
-    # TODO: Warm up ML models if needed
+    # Encodage tiktoken chargé ici plutôt qu'à la première requête LLM
+    # (lecture / téléchargement bloquant du fichier BPE)
+    await asyncio.to_thread(warm_up_tokenizer)
     
     yield
     
@@ -37,6 +41,7 @@ app = FastAPI(
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Logging middleware (pour déboguer les headers)
@@ -79,4 +84,6 @@ if __name__ == "__main__":
         port=settings.SERVICE_PORT,
         reload=settings.DEBUG,
         log_level=settings.LOG_LEVEL.lower(),
+        loop="uvloop",
+        http="httptools",
     )
\ No newline at end of file